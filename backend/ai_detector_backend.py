@@ -1,6 +1,13 @@
 """
 AI Content Detector Backend - Vertex AI
 Gunicorn + Flask compatible (old Flask safe)
+
+/analyze blocks on the Vertex AI round-trip, so run it with threaded
+workers to overlap concurrent requests instead of queueing them:
+
+    gunicorn -k gthread --workers 2 --threads 32 ai_detector_backend:app
+
+The FastAPI service (api/services/ai_detector.py) uses the async client.
 """
 
 # -------- ENV --------
@@ -14,17 +21,56 @@ import os
 import json
 import base64
 
-from flask import Flask, request, jsonify
+import orjson
+from flask import Flask, Response, request
 from flask_cors import CORS
 
 app = Flask(__name__)
 CORS(app)
 
+
+
+def json_response(obj, status=200):
+    """Serialize with orjson instead of Flask's stdlib-based jsonify."""
+    return Response(orjson.dumps(obj), status=status, mimetype="application/json")
+
 # -------- CONFIG --------
 PROJECT_ID = os.getenv("GOOGLE_CLOUD_PROJECT", "")
 LOCATION = os.getenv("VERTEX_AI_LOCATION", "us-central1")
 SERVICE_ACCOUNT_FILE = os.getenv("GOOGLE_APPLICATION_CREDENTIALS", "")
 
+MODEL_NAME = "gemini-2.0-flash-001"
+
+# Structured output schema; Gemini returns bare JSON matching it
+RESPONSE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "verdict": {
+            "type": "string",
+            "enum": ["AI_GENERATED", "LIKELY_REAL", "UNCERTAIN"],
+        },
+        "confidence": {"type": "number"},
+        "explanation": {"type": "string"},
+        "indicators": {"type": "array", "items": {"type": "string"}},
+    },
+    "required": ["verdict", "confidence", "explanation", "indicators"],
+}
+
+
+def _build_prompt(media_type):
+    return f"""
+Analyze this {media_type}. Respond ONLY in JSON:
+{{
+  "verdict": "AI_GENERATED" | "LIKELY_REAL" | "UNCERTAIN",
+  "confidence": 0-100,
+  "explanation": "text",
+  "indicators": ["list"]
+}}
+"""
+
+
+PROMPTS = {media_type: _build_prompt(media_type) for media_type in ("image", "video")}
+
 vertex_initialized = False
 model = None
 
@@ -38,7 +84,7 @@ def initialize_vertex():
 
     try:
         import vertexai
-        from vertexai.generative_models import GenerativeModel
+        from vertexai.generative_models import GenerativeModel, GenerationConfig
 
         if not PROJECT_ID and SERVICE_ACCOUNT_FILE and os.path.exists(SERVICE_ACCOUNT_FILE):
             with open(SERVICE_ACCOUNT_FILE) as f:
@@ -48,7 +94,13 @@ def initialize_vertex():
             raise RuntimeError("GOOGLE_CLOUD_PROJECT not set")
 
         vertexai.init(project=PROJECT_ID, location=LOCATION)
-        model = GenerativeModel("gemini-2.0-flash-001")
+        model = GenerativeModel(
+            MODEL_NAME,
+            generation_config=GenerationConfig(
+                response_mime_type="application/json",
+                response_schema=RESPONSE_SCHEMA,
+            ),
+        )
         vertex_initialized = True
 
         print("✅ Vertex AI initialized")
@@ -66,7 +118,7 @@ initialize_vertex()
 # -------- ROUTES --------
 @app.route("/health")
 def health():
-    return jsonify({
+    return json_response({
         "status": "healthy" if vertex_initialized else "not_ready",
         "project": PROJECT_ID or "not_set",
         "location": LOCATION
@@ -76,40 +128,26 @@ def health():
 @app.route("/analyze", methods=["POST"])
 def analyze():
     if not vertex_initialized:
-        return jsonify({"error": "Vertex not initialized"}), 500
+        return json_response({"error": "Vertex not initialized"}, 500)
 
     try:
         from vertexai.generative_models import Part
 
         data = request.get_json()
         if not data or "file_data" not in data:
-            return jsonify({"error": "file_data missing"}), 400
+            return json_response({"error": "file_data missing"}, 400)
 
         media = base64.b64decode(data["file_data"])
         mime = data.get("mime_type", "image/jpeg")
         media_type = "image" if mime.startswith("image/") else "video"
 
-        prompt = f"""
-Analyze this {media_type}. Respond ONLY in JSON:
-{{
-  "verdict": "AI_GENERATED" | "LIKELY_REAL" | "UNCERTAIN",
-  "confidence": 0-100,
-  "explanation": "text",
-  "indicators": ["list"]
-}}
-"""
-
         part = Part.from_data(media, mime_type=mime)
-        response = model.generate_content([prompt, part])
-
-        raw = response.text.strip()
-        if raw.startswith("```"):
-            raw = raw.replace("```json", "").replace("```", "").strip()
+        response = model.generate_content([PROMPTS[media_type], part])
 
-        return jsonify({"success": True, "result": json.loads(raw)})
+        return json_response({"success": True, "result": orjson.loads(response.text)})
 
     except Exception as e:
-        return jsonify({"success": False, "error": str(e)}), 500
+        return json_response({"success": False, "error": str(e)}, 500)
 
 
 # -------- DEV ONLY --------
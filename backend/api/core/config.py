@@ -1,8 +1,9 @@
 """
 Application Configuration
 """
-from pydantic_settings import BaseSettings
-from typing import List, Optional
+from functools import lru_cache
+from pydantic_settings import BaseSettings, SettingsConfigDict
+from typing import Optional, Tuple
 import os
 
 
@@ -17,23 +18,60 @@ class Settings(BaseSettings):
     # Server Settings
     HOST: str = "0.0.0.0"
     PORT: int = 8000
+    WEB_CONCURRENCY: int = 1  # Server worker processes (gunicorn workers)
     
     # CORS Settings
-    CORS_ORIGINS: List[str] = [
-        "http://localhost:3000", 
-        "http://localhost:3001",
-        "http://localhost:8080",
-        "http://127.0.0.1:3000",
-        "http://127.0.0.1:3001",
-    ]
+    # Local dev origins are matched by a regex Starlette compiles once;
+    # list extra (e.g. production) origins in CORS_ORIGINS.
+    CORS_ORIGIN_REGEX: Optional[str] = r"^https?://(localhost|127\.0\.0\.1)(:\d{2,5})?$"
+    CORS_ORIGINS: Tuple[str, ...] = ()
     
     # Model Settings
+    PRELOAD_MODELS: bool = False  # Load detectors at import (gunicorn preload_app)
+    WARMUP: bool = False  # Dummy forward pass per detector at startup
     MODEL_PATH: str = "./models/weights"
     CONFIDENCE_THRESHOLD: float = 0.5
+    MODEL_CACHE_SIZE: int = 4  # Max on-demand models (image variants, GenConViT nets) kept loaded
+    QUANTIZE_INT8: bool = False  # int8 dynamic quantization on CPU (disables heatmaps)
+    NPR_CALIBRATION_DIR: Optional[str] = None  # Images for static int8 NPR (with QUANTIZE_INT8)
+    TORCH_COMPILE: bool = False  # torch.compile EfficientNet/GenConViT/NPR (disables EfficientNet's Grad-CAM heatmaps)
+    JIT_FREEZE: bool = False  # TorchScript trace + freeze GenConViT/NPR on CPU (when not compiled)
+    ONNX_RUNTIME: bool = False  # Serve EfficientNet through onnxruntime (TensorRT/CUDA EP when available)
+    ONNX_CACHE_DIR: str = ".onnx_cache"  # Exported graphs and TensorRT engines
+    GENCONVIT_TRT_ENGINE: Optional[str] = None  # Torch-TensorRT GenConViT module (built on first GPU load)
+    AUTO_PLACE_DETECTORS: bool = False  # Spread ensemble detectors across GPUs by free VRAM (else CPU)
+    INFERENCE_SLOTS: int = 2  # Max concurrent detector forward passes
+    BATCH_MAX_SIZE: int = 10  # Max images per micro-batch (>= MAX_BATCH_FILES)
+    BATCH_TIMEOUT_MS: float = 15.0  # Max wait for a micro-batch to fill
+    VIDEO_BATCH_MAX_SIZE: int = 4  # Max video clips coalesced into one GenConViT forward
+    INFERENCE_THREADS: int = 0  # Inference thread pool size (0 = 1 per GPU, else cores / 2)
+    HEATMAP_THREADS: int = 1  # Side pool for opt-in heatmaps (extra backward pass)
+    CUDA_STREAMS: int = 4  # CUDA streams shared by concurrent GPU batches
+    GPU_MEM_FRACTION: float = 0.85  # Per-process cap on GPU memory (1.0 disables)
+    CUDA_TF32: bool = False  # TF32 tensor cores for matmuls/convs (all detectors, lower precision)
+    CUDNN_BENCHMARK: bool = False  # Let cuDNN autotune conv algorithms per input shape
+    INFERENCE_PROCESSES: int = 0  # Image inference process pool (0 = off, -1 = cores / WEB_CONCURRENCY)
+    
+    # Admin Settings
+    ADMIN_TOKEN: Optional[str] = None  # Enables /admin routes (X-Admin-Token header)
+    
+    # Upload Settings
+    TEMP_UPLOAD_DIR: Optional[str] = None  # Audio temp files (default: /dev/shm/macroblank, else temp_uploads)
+    
+    # Result Cache Settings (keyed by SHA-256 of the upload)
+    RESULT_CACHE_SIZE: int = 1024  # Max cached results (0 disables)
+    RESULT_CACHE_TTL_SECONDS: float = 600.0
+    
+    # Batch Detection Settings
+    MAX_BATCH_FILES: int = 10  # Max files per /detect/batch request
+    BATCH_CONCURRENCY: int = 4  # Videos from one batch processed concurrently
     
     # Video Detection Settings
     VIDEO_FACE_CONFIDENCE_THRESHOLD: float = 0.3
     VIDEO_FAKE_THRESHOLD: float = 0.5
+    VIDEO_FACE_BATCH_SIZE: int = 16  # Sampled frames per YOLO / VeridisQuo forward
+    VIDEO_SCENE_DIFF_THRESHOLD: float = 2.0  # Reuse face boxes while sampled frames differ less (0 disables)
+    VIDEO_TRT_ENGINE: Optional[str] = None  # Torch-TensorRT VeridisQuo module (built on first GPU load)
     
     # Security
     SECRET_KEY: str = "your-secret-key-change-in-production"
@@ -44,11 +82,19 @@ class Settings(BaseSettings):
     GOOGLE_CLOUD_PROJECT: Optional[str] = None
     VERTEX_AI_LOCATION: str = "us-central1"
     
-    class Config:
-        env_file = ".env"
-        case_sensitive = True
-        extra = "ignore"  # Allow extra env vars
+    model_config = SettingsConfigDict(
+        env_file=".env",
+        case_sensitive=True,
+        extra="ignore",  # Allow extra env vars
+        frozen=True,
+    )
+
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Load settings once per process (parses .env and the environment)."""
+    return Settings()
 
 
 # Global settings instance
-settings = Settings()
+settings = get_settings()
@@ -3,11 +3,94 @@ MacroBlank API - Deepfake Detection Service
 """
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from contextlib import asynccontextmanager
+import asyncio
+import os
+
+# Read when CUDA initializes, so it must be set before torch is imported
+# (the route modules below import it). Expandable segments let the
+# allocator grow blocks in place instead of fragmenting across variants.
+os.environ.setdefault(
+    "PYTORCH_CUDA_ALLOC_CONF", "expandable_segments:True,max_split_size_mb:512"
+)
+
+from api.routes import detection, health, auth, ai_detection, audio_detection, image_detection, admin
+from api.services import inference_pool
+from api.services.model_manager import initialize_models
+
+from api.core.config import get_settings
+
+settings = get_settings()
+
+
+if settings.PRELOAD_MODELS and not settings.AUTO_PLACE_DETECTORS:
+    initialize_models()
+
+
+def warmup_models() -> None:
+    """
+    Run one dummy forward pass through each detector.
+    
+    Pays lazy construction, cuDNN autotuning and allocator growth at
+    startup instead of on the first requests.
+    """
+    from PIL import Image
+    from api.services.model_manager import model_manager
+    from api.routes.image_detection import load_detector
+    
+    blank = Image.new("RGB", (224, 224))
+    
+    for name in model_manager.list_detectors():
+        detector = model_manager.get_detector(name)
+        try:
+            detector.detect(blank)
+            print(f"🔥 Warmed up {name}")
+        except Exception as e:
+            print(f"⚠️ Warm-up failed for {name}: {e}")
+    
+    for variant in ("vae", "ed"):
+        try:
+            detector = load_detector(variant)
+            detector.predict_batch(detector.transform(blank).unsqueeze(0))
+            print(f"🔥 Warmed up image detector ({variant})")
+        except Exception as e:
+            print(f"⚠️ Warm-up failed for image detector ({variant}): {e}")
 
-from api.routes import detection, health, auth, ai_detection, audio_detection, image_detection
 
-from api.core.config import settings
+def configure_cuda_memory() -> None:
+    """
+    Cap this process's share of GPU memory (GPU_MEM_FRACTION).
+    
+    Called per worker from the lifespan hook rather than at import, since
+    it creates a CUDA context and that must not happen before the fork.
+    """
+    import torch
+    
+    if not torch.cuda.is_available() or not 0 < settings.GPU_MEM_FRACTION < 1:
+        return
+    
+    for device in range(torch.cuda.device_count()):
+        torch.cuda.set_per_process_memory_fraction(settings.GPU_MEM_FRACTION, device)
+    print(f"🎛️ GPU memory capped at {settings.GPU_MEM_FRACTION:.0%} per device")
+
+
+def configure_cuda_backends() -> None:
+    """
+    Apply the process-wide CUDA math settings (CUDA_TF32, CUDNN_BENCHMARK).
+    
+    These flags affect every model in the process, so they are set once
+    at startup rather than by whichever detector module is imported.
+    """
+    import torch
+    
+    if settings.CUDA_TF32:
+        torch.backends.cuda.matmul.allow_tf32 = True
+        torch.backends.cudnn.allow_tf32 = True
+        print("🎛️ TF32 enabled for matmuls and convolutions")
+    if settings.CUDNN_BENCHMARK:
+        torch.backends.cudnn.benchmark = True
+        print("🎛️ cuDNN benchmark mode enabled")
 
 
 @asynccontextmanager
@@ -16,36 +99,24 @@ async def lifespan(app: FastAPI):
     # Startup
     print("🚀 MacroBlank API starting up...")
     
-    # Register and load detectors for ensemble detection
-    try:
-        from pathlib import Path
-        from api.services.model_manager import model_manager
-        from api.services.universal_fake_detector import UniversalFakeDetector
-        from api.services.npr_detector import NPRDetector
-        
-        # 1. Universal Fake Detector (CLIP-based, semantic features)
-        ufd = UniversalFakeDetector(device="cpu")
-        model_manager.register_detector(ufd)
-        ufd.load_model()
-        print("✅ Universal Fake Detector loaded")
-        
-        # 2. NPR Detector (ResNet-based, texture/frequency analysis)
-        npr_weights = Path(__file__).parent.parent / "models" / "NPR.pth"
-        npr = NPRDetector(model_path=npr_weights, device="cpu")
-        model_manager.register_detector(npr)
-        npr.load_model()
-        print("✅ NPR Detector loaded")
-        
-        print("🔗 Ensemble detection enabled (UFD + NPR)")
-        
-    except Exception as e:
-        print(f"⚠️ Failed to load detectors: {e}")
-        import traceback
-        traceback.print_exc()
+    configure_cuda_memory()
+    configure_cuda_backends()
+    initialize_models()
+    
+    if settings.WARMUP:
+        await asyncio.to_thread(warmup_models)
+    
+    workers = inference_pool.resolve_workers(
+        settings.INFERENCE_PROCESSES, settings.WEB_CONCURRENCY
+    )
+    if workers:
+        inference_pool.start_pool(workers)
+        print(f"🧵 Inference pool started ({workers} processes)")
     
     yield
     
     # Shutdown
+    inference_pool.shutdown_pool()
     print("👋 MacroBlank API shutting down...")
 
 
@@ -53,12 +124,14 @@ app = FastAPI(
     title="MacroBlank API",
     description="Adversarial Deepfake Detection System",
     version="0.1.0",
+    default_response_class=ORJSONResponse,
     lifespan=lifespan,
 )
 
 # CORS Configuration
 app.add_middleware(
     CORSMiddleware,
+    allow_origin_regex=settings.CORS_ORIGIN_REGEX,
     allow_origins=settings.CORS_ORIGINS,
     allow_credentials=True,
     allow_methods=["*"],
@@ -69,6 +142,7 @@ app.add_middleware(
 app.include_router(health.router, tags=["Health"])
 app.include_router(detection.router, prefix="/api/v1", tags=["Detection"])
 app.include_router(auth.router, prefix="/api/v1/auth", tags=["Authentication"])
+app.include_router(admin.router, prefix="/api/v1/admin", tags=["Admin"])
 app.include_router(image_detection.router, prefix="/api/v1", tags=["Image Detection"])
 app.include_router(ai_detection.router, prefix="/api/v1", tags=["AI Content Detection"])
 app.include_router(audio_detection.router, prefix="/api/v1", tags=["Audio Detection"])
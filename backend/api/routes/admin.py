@@ -0,0 +1,40 @@
+"""
+Admin Routes - Operational endpoints (disabled unless ADMIN_TOKEN is set)
+"""
+import secrets
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import ORJSONResponse
+
+from api.core.config import get_settings
+from api.routes.image_detection import close_batchers
+from api.services.model_cache import model_cache
+
+router = APIRouter()
+settings = get_settings()
+
+
+def _check_token(token: Optional[str]) -> None:
+    """Reject the request unless it carries the configured admin token."""
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if token is None or not secrets.compare_digest(token, settings.ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+@router.post("/unload")
+async def unload_models(x_admin_token: Optional[str] = Header(None)):
+    """
+    Unload every on-demand model (image variants, GenConViT services).
+    
+    Frees their RAM/VRAM in the worker that handles the request, once any
+    running forward passes finish; requests still queued for an image
+    variant fail, and models reload on next use. The always-on ensemble
+    detectors are unaffected.
+    """
+    _check_token(x_admin_token)
+    unloaded = model_cache.clear()
+    # The image variants' batchers hold their detectors too
+    close_batchers()
+    return ORJSONResponse({"unloaded": unloaded})
@@ -3,7 +3,8 @@ AI Content Detection Routes
 
 Endpoints for detecting AI-generated content using Vertex AI.
 """
-from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi import APIRouter, UploadFile, File, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Optional, Dict, Any
 import base64
@@ -12,6 +13,12 @@ from api.services.ai_detector import ai_detector
 
 router = APIRouter()
 
+_ALLOWED_TYPES = frozenset({
+    "image/jpeg", "image/png", "image/webp", "image/gif",
+    "video/mp4", "video/webm", "video/quicktime"
+})
+_BAD_TYPE_DETAIL = f"Invalid file type. Allowed: {sorted(_ALLOWED_TYPES)}"
+
 
 class AIDetectionRequest(BaseModel):
     """Request model for base64 AI detection."""
@@ -34,26 +41,32 @@ async def ai_detector_status():
 
 
 @router.post("/ai-detect", response_model=AIDetectionResponse)
-async def detect_ai_content(file: UploadFile = File(...)):
+async def detect_ai_content(
+    file: UploadFile = File(...),
+    stream: bool = Query(False, description="Stream the verdict as Server-Sent Events")
+):
     """
     Detect if uploaded media is AI-generated.
     
     Args:
         file: Image or video file
+        stream: Return a text/event-stream of verdict fragments instead of JSON
         
     Returns:
         AI detection result with verdict and confidence
     """
     # Validate file type
-    allowed_types = [
-        "image/jpeg", "image/png", "image/webp", "image/gif",
-        "video/mp4", "video/webm", "video/quicktime"
-    ]
-    
-    if file.content_type not in allowed_types:
+    if file.content_type not in _ALLOWED_TYPES:
         raise HTTPException(
             status_code=400,
-            detail=f"Invalid file type. Allowed: {allowed_types}"
+            detail=_BAD_TYPE_DETAIL
+        )
+    
+    if stream:
+        file_data = await file.read()
+        return StreamingResponse(
+            ai_detector.analyze_stream(file_data, file.content_type),
+            media_type="text/event-stream"
         )
     
     try:
@@ -77,6 +90,9 @@ async def detect_ai_content_base64(request: AIDetectionRequest):
     """
     Detect if base64-encoded media is AI-generated.
     
+    Prefer the multipart `/ai-detect` endpoint for large files; base64
+    inflates the payload by ~33% and must be decoded server-side.
+    
     Args:
         request: Base64 encoded file data and mime type
         
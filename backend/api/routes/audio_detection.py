@@ -1,16 +1,67 @@
+import asyncio
+import io
 import os
-import shutil
-import uuid
+import tempfile
+from pathlib import Path
+from typing import BinaryIO, Optional
+
+import aiofiles
+import aiofiles.tempfile
 from fastapi import APIRouter, UploadFile, File, HTTPException
+from api.core.config import get_settings
+from api.services.inference_pool import run_in_thread
 from model.audio.detector import AudioDeepfakeDetector
 
 router = APIRouter(prefix="/audio", tags=["Audio Detection"])
+settings = get_settings()
 
 # Initialize detector as a singleton to avoid reloading weights for every request
 # Note: In a real production app with multiple workers, this would initialize per worker.
 # For better resource management, we could use dependency injection or lifespan events.
 detector = AudioDeepfakeDetector()
 
+# Read uploads in 1 MiB chunks
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# RAM-backed (tmpfs) when available so the temp write never reaches the
+# block device; audio clips are small enough for Docker's default /dev/shm.
+# Created once per process rather than checked on every request.
+TEMP_DIR = settings.TEMP_UPLOAD_DIR or (
+    "/dev/shm/macroblank" if os.path.isdir("/dev/shm") else "temp_uploads"
+)
+os.makedirs(TEMP_DIR, exist_ok=True)
+
+# libsndfile decodes these straight from memory; other formats (e.g. MP3
+# via audioread) need a real file path
+IN_MEMORY_AUDIO_TYPES = frozenset({
+    "audio/wav", "audio/x-wav", "audio/wave", "audio/vnd.wave",
+    "audio/flac", "audio/x-flac", "audio/ogg",
+})
+
+
+def _disk_fileno(upload: BinaryIO) -> Optional[int]:
+    """Return the fd of an upload already spooled to disk, else None."""
+    if not hasattr(os, "sendfile"):
+        return None
+    if isinstance(upload, tempfile.SpooledTemporaryFile) and not upload._rolled:
+        return None
+    try:
+        return upload.fileno()
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        return None
+
+
+def _sendfile_copy(src_fd: int, dst_fd: int) -> None:
+    """Copy a file in-kernel with os.sendfile (no userspace buffer)."""
+    size = os.fstat(src_fd).st_size
+    offset = 0
+    while offset < size:
+        sent = os.sendfile(dst_fd, src_fd, offset, size - offset)
+        if sent == 0:
+            break
+        offset += sent
+
+
 @router.post("/detect")
 async def detect_audio(file: UploadFile = File(...)):
     """
@@ -20,19 +71,35 @@ async def detect_audio(file: UploadFile = File(...)):
     if not file.content_type.startswith("audio/"):
         raise HTTPException(status_code=400, detail="Uploaded file is not a valid audio format.")
 
-    # 2. Temporary Storage: Generate a unique ID to prevent collisions
-    temp_dir = "temp_uploads"
-    os.makedirs(temp_dir, exist_ok=True)
-    temp_path = os.path.join(temp_dir, f"{uuid.uuid4()}_{file.filename}")
+    temp_path = None
 
     try:
-        # 3. Intake: Stream to disk (avoids high RAM usage for large audio files)
-        with open(temp_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        # 2. Intake
+        src_fd = _disk_fileno(file.file)
+        if file.content_type in IN_MEMORY_AUDIO_TYPES and src_fd is None:
+            # Decode straight from memory: no temp file write/read/unlink
+            audio_source = io.BytesIO(await file.read())
+        else:
+            # 3. Temporary Storage: uniquely named file in the cached temp dir.
+            # Uploads Starlette already spilled to disk are copied in-kernel;
+            # in-memory ones are streamed in chunks, both off the event loop.
+            async with aiofiles.tempfile.NamedTemporaryFile(
+                "wb",
+                dir=TEMP_DIR,
+                suffix=Path(file.filename or "").suffix,
+                delete=False,
+            ) as buffer:
+                temp_path = buffer.name
+                if src_fd is not None:
+                    await asyncio.to_thread(_sendfile_copy, src_fd, buffer.fileno())
+                else:
+                    while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                        await buffer.write(chunk)
+            audio_source = temp_path
 
         # 4. Layer 3: Model Inference
-        # calls the predict method from AudioDeepfakeDetector
-        results = detector.predict(temp_path)
+        # calls the predict method from AudioDeepfakeDetector on the inference pool
+        results = await run_in_thread(detector.predict, audio_source)
         
         return {
             "status": "success",
@@ -43,5 +110,5 @@ async def detect_audio(file: UploadFile = File(...)):
         raise HTTPException(status_code=500, detail=str(e))
     finally:
         # 5. Cleanup: Always delete temp files
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
+        if temp_path is not None:
+            os.unlink(temp_path)
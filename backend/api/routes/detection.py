@@ -1,9 +1,20 @@
 """
 Detection Routes - Image and Video Deepfake Detection Endpoints
 """
-from fastapi import APIRouter, UploadFile, File, HTTPException
+import asyncio
+import hashlib
+import os
+import time
+from pathlib import Path
+
+import aiofiles
+import aiofiles.tempfile
+from fastapi import APIRouter, UploadFile, File, HTTPException, Query, Request
 from typing import Optional
 
+from api.core.config import get_settings
+from api.services.result_cache import content_digest, result_cache
+from api.utils.uploads import stream_upload_to_disk
 from api.schemas.detection import (
     DetectionRequest,
     DetectionResponse,
@@ -12,12 +23,55 @@ from api.schemas.detection import (
 )
 
 router = APIRouter()
+settings = get_settings()
+
+# Response models below are built from our own pipeline output, so they use
+# model_construct() and skip constructor validation; FastAPI still
+# serializes them through response_model.
+
+# Caps how many videos of a batch run through the models at once
+_batch_slots = asyncio.Semaphore(settings.BATCH_CONCURRENCY)
+
+_ALLOWED_IMAGE = frozenset({"image/jpeg", "image/png", "image/webp"})
+_ALLOWED_VIDEO = frozenset({"video/mp4", "video/avi", "video/quicktime", "video/x-msvideo"})
+_BAD_IMAGE_TYPE_DETAIL = f"Invalid file type. Allowed: {sorted(_ALLOWED_IMAGE)}"
+
+# Uploads are spooled to disk in 1 MiB chunks
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+async def _spool_to_disk(
+    file: UploadFile,
+    default_suffix: str = ".mp4",
+) -> str:
+    """
+    Stream an upload into a named temp file without buffering it in memory.
+    
+    The caller is responsible for removing the returned path.
+    
+    Args:
+        file: Incoming upload
+        default_suffix: Extension to use when the filename has none
+        
+    Returns:
+        Path to the temp file
+    """
+    suffix = Path(file.filename or "").suffix or default_suffix
+    async with aiofiles.tempfile.NamedTemporaryFile("wb", suffix=suffix, delete=False) as tmp:
+        try:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                await tmp.write(chunk)
+        except BaseException:
+            os.remove(tmp.name)
+            raise
+        return tmp.name
 
 
 @router.post("/detect/image", response_model=DetectionResponse)
 async def detect_image(
     file: UploadFile = File(...),
-    confidence_threshold: Optional[float] = 0.5
+    confidence_threshold: Optional[float] = 0.5,
+    include_heatmap: bool = Query(False, description="Also return a heatmap (extra backward pass)")
 ):
     """
     Analyze an image for deepfake manipulation.
@@ -25,6 +79,7 @@ async def detect_image(
     Args:
         file: Image file (JPEG, PNG, WebP)
         confidence_threshold: Minimum confidence for detection (0.0 - 1.0)
+        include_heatmap: Generate a heatmap of manipulated regions
     
     Returns:
         Detection result with confidence scores
@@ -32,26 +87,33 @@ async def detect_image(
     from api.services.model_manager import model_manager
     
     # Validate file type
-    allowed_types = ["image/jpeg", "image/png", "image/webp"]
-    if file.content_type not in allowed_types:
+    if file.content_type not in _ALLOWED_IMAGE:
         raise HTTPException(
             status_code=400,
-            detail=f"Invalid file type. Allowed: {allowed_types}"
+            detail=_BAD_IMAGE_TYPE_DETAIL
         )
     
     try:
         # Read image bytes
         image_bytes = await file.read()
         
-        # Run detection through model manager
-        result = await model_manager.detect_image(
-            image_bytes=image_bytes,
-            use_ensemble=True
-        )
+        # Duplicate uploads are answered from the result cache
+        cache_key = ("detect_image", include_heatmap, content_digest(image_bytes))
+        result = result_cache.get(cache_key)
+        
+        if result is None:
+            # Run detection through model manager
+            result = await model_manager.detect_image(
+                image_bytes=image_bytes,
+                use_ensemble=True,
+                content_type=file.content_type,
+                include_heatmap=include_heatmap
+            )
+            result_cache.put(cache_key, result)
         
         # Check for errors
         if "error" in result and result["error"]:
-            return DetectionResponse(
+            return DetectionResponse.model_construct(
                 is_fake=False,
                 confidence=0.0,
                 model_scores={},
@@ -61,7 +123,7 @@ async def detect_image(
                 }
             )
         
-        return DetectionResponse(
+        return DetectionResponse.model_construct(
             is_fake=result.get("is_fake", False),
             confidence=result.get("confidence", 0.0),
             model_scores=result.get("model_scores", {}),
@@ -80,17 +142,41 @@ async def detect_image(
         )
 
 
-@router.post("/detect/video", response_model=DetectionResponse)
+# The body is parsed by hand (see detect_video), so describe it for the docs
+_VIDEO_UPLOAD_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["file"],
+                    "properties": {"file": {"type": "string", "format": "binary"}},
+                }
+            }
+        },
+    }
+}
+
+
+@router.post(
+    "/detect/video",
+    response_model=DetectionResponse,
+    openapi_extra=_VIDEO_UPLOAD_BODY,
+)
 async def detect_video(
-    file: UploadFile = File(...),
+    request: Request,
     sample_rate: Optional[int] = 10,
     confidence_threshold: Optional[float] = 0.5
 ):
     """
     Analyze a video for deepfake manipulation.
     
+    The multipart body is streamed straight to a temp file rather than
+    through UploadFile, so the video is never spooled or held in memory.
+    
     Args:
-        file: Video file (MP4, AVI, MOV)
+        file: Video file (MP4, AVI, MOV), multipart form field
         sample_rate: Analyze every Nth frame
         confidence_threshold: Minimum confidence for detection
     
@@ -99,42 +185,50 @@ async def detect_video(
     """
     from api.services.model_manager import model_manager
     
-    allowed_types = ["video/mp4", "video/avi", "video/quicktime", "video/x-msvideo"]
-    if file.content_type not in allowed_types:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Invalid file type. Allowed: {allowed_types}"
+    # Stream to disk so frames are decoded straight from the file,
+    # hashing on the way for the result cache
+    digest = hashlib.sha256()
+    try:
+        upload = await stream_upload_to_disk(
+            request,
+            field_name="file",
+            allowed_types=_ALLOWED_VIDEO,
+            hasher=digest
         )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     try:
-        # Read video bytes
-        video_bytes = await file.read()
+        cache_key = ("detect_video", sample_rate, digest.digest())
+        result = result_cache.get(cache_key)
         
-        # Run detection through model manager
-        result = await model_manager.detect_video(
-            video_bytes=video_bytes,
-            sample_rate=sample_rate
-        )
+        if result is None:
+            # Run detection through model manager
+            result = await model_manager.detect_video_path(
+                video_path=upload.path,
+                sample_rate=sample_rate
+            )
+            result_cache.put(cache_key, result)
         
         # Check for errors
         if "error" in result and result["error"]:
-            return DetectionResponse(
+            return DetectionResponse.model_construct(
                 is_fake=False,
                 confidence=0.0,
                 model_scores={},
                 metadata={
-                    "filename": file.filename,
+                    "filename": upload.filename,
                     "error": result["error"]
                 }
             )
         
-        return DetectionResponse(
+        return DetectionResponse.model_construct(
             is_fake=result.get("is_fake", False),
             confidence=result.get("confidence", 0.0),
             model_scores=result.get("model_scores", {}),
             metadata={
-                "filename": file.filename,
-                "content_type": file.content_type,
+                "filename": upload.filename,
+                "content_type": upload.content_type,
                 "frames_analyzed": result.get("frames_analyzed", 0),
                 "video_info": result.get("video_info", {}),
                 "temporal_analysis": result.get("temporal_analysis", {})
@@ -146,6 +240,8 @@ async def detect_video(
             status_code=500,
             detail=f"Video detection failed: {str(e)}"
         )
+    finally:
+        os.remove(upload.path)
 
 
 @router.post("/detect/batch", response_model=BatchDetectionResponse)
@@ -159,24 +255,71 @@ async def detect_batch(files: list[UploadFile] = File(...)):
     Returns:
         Batch detection results
     """
-    if len(files) > 10:
+    from api.services.model_manager import model_manager
+    
+    if len(files) > settings.MAX_BATCH_FILES:
         raise HTTPException(
             status_code=400,
-            detail="Maximum 10 files per batch"
+            detail=f"Maximum {settings.MAX_BATCH_FILES} files per batch"
         )
     
-    # TODO: Implement batch processing
-    results = []
-    for file in files:
-        results.append(BatchResultItem(
+    async def _detect_one(file: UploadFile) -> BatchResultItem:
+        content_type = file.content_type or ""
+        
+        if content_type.startswith("image/"):
+            # Not gated by _batch_slots: images from the whole batch reach the
+            # detectors' micro-batchers together and share forward passes
+            result = await model_manager.detect_image(
+                image_bytes=await file.read(),
+                use_ensemble=True,
+                content_type=content_type
+            )
+        elif content_type.startswith("video/"):
+            async with _batch_slots:
+                video_path = await _spool_to_disk(file)
+                try:
+                    result = await model_manager.detect_video_path(video_path=video_path)
+                finally:
+                    os.remove(video_path)
+        else:
+            raise ValueError(f"Unsupported file type: {content_type}")
+        
+        if result.get("error"):
+            raise RuntimeError(result["error"])
+        
+        return BatchResultItem.model_construct(
             filename=file.filename,
-            is_fake=False,
-            confidence=0.90
-        ))
+            is_fake=result.get("is_fake", False),
+            confidence=result.get("confidence", 0.0)
+        )
+    
+    start_time = time.time()
+    outcomes = await asyncio.gather(
+        *[_detect_one(file) for file in files],
+        return_exceptions=True
+    )
+    
+    results = []
+    for file, outcome in zip(files, outcomes):
+        if isinstance(outcome, Exception):
+            results.append(BatchResultItem.model_construct(
+                filename=file.filename,
+                is_fake=False,
+                confidence=0.0,
+                error=str(outcome)
+            ))
+        else:
+            results.append(outcome)
+    
+    error_count = sum(1 for r in results if r.error)
+    fake_count = sum(1 for r in results if not r.error and r.is_fake)
     
-    return BatchDetectionResponse(
+    return BatchDetectionResponse.model_construct(
         total_files=len(files),
-        fake_count=0,
-        real_count=len(files),
-        results=results
+        fake_count=fake_count,
+        real_count=len(files) - fake_count - error_count,
+        error_count=error_count,
+        results=results,
+        processing_time_ms=(time.time() - start_time) * 1000,
+        timestamp_ms=int(start_time * 1000)
     )
@@ -2,7 +2,10 @@
 Health Check Routes
 """
 from fastapi import APIRouter
-from datetime import datetime
+from fastapi.responses import ORJSONResponse
+import time
+
+from api.services.model_manager import model_manager
 
 router = APIRouter()
 
@@ -10,11 +13,12 @@ router = APIRouter()
 @router.get("/health")
 async def health_check():
     """Basic health check endpoint."""
-    return {
+    # Returning the response directly skips jsonable_encoder on every probe
+    return ORJSONResponse({
         "status": "healthy",
-        "timestamp": datetime.utcnow().isoformat(),
+        "timestamp_ms": int(time.time() * 1000),
         "service": "macroblank-api"
-    }
+    })
 
 
 @router.get("/ready")
@@ -22,17 +26,18 @@ async def readiness_check():
     """
     Readiness check - verifies all dependencies are available.
     """
-    # TODO: Add actual checks
+    model_status = model_manager.get_health_status()
     checks = {
         "api": True,
-        "models_loaded": False,  # Update when models are loaded
+        "models_loaded": model_status["all_models_loaded"],
         "database": True  # Update if using database
     }
     
     all_ready = all(checks.values())
     
-    return {
+    return ORJSONResponse({
         "ready": all_ready,
         "checks": checks,
-        "timestamp": datetime.utcnow().isoformat()
-    }
+        "models": model_status,
+        "timestamp_ms": int(time.time() * 1000)
+    })
@@ -1,26 +1,78 @@
-import os
-import shutil
-import uuid
+import asyncio
+from typing import List
+
 from fastapi import APIRouter, UploadFile, File, HTTPException, Query
+from fastapi.responses import ORJSONResponse
+from api.core.config import get_settings
+from api.services.batching import MicroBatcher
+from api.services.model_cache import model_cache
+from api.services.result_cache import content_digest, result_cache
 from model.image.detector import ImageDeepfakeDetector
 
 router = APIRouter(prefix="/image", tags=["Image Detection"])
+settings = get_settings()
+
+_ALLOWED_TYPES = frozenset({"image/jpeg", "image/jpg", "image/png", "image/webp"})
+_ALLOWED_VARIANTS = frozenset({"vae", "ed"})
+_BAD_VARIANT_DETAIL = f"Invalid variant. Allowed: {sorted(_ALLOWED_VARIANTS)}"
 
-# Initialize detector as a singleton (loads weights once)
+# Detectors live in the shared LRU model cache (weights load once per variant)
 # Using VAE variant by default - can be changed via query param
-_detectors = {}
+def load_detector(variant: str = "vae") -> ImageDeepfakeDetector:
+    """Get or create the detector for a variant (blocks while loading on a miss)."""
+    # Always on CPU, so no GPU size estimate for the cache
+    return model_cache.get(
+        f"image_genconvit_{variant}",
+        lambda: ImageDeepfakeDetector(variant=variant),
+    )
+
 
-def get_detector(variant: str = "vae") -> ImageDeepfakeDetector:
-    """Get or create detector for the specified variant."""
-    if variant not in _detectors:
-        try:
-            _detectors[variant] = ImageDeepfakeDetector(variant=variant)
-        except Exception as e:
-            raise HTTPException(
-                status_code=500, 
-                detail=f"Failed to load image detector ({variant}): {str(e)}"
-            )
-    return _detectors[variant]
+async def get_detector(variant: str = "vae") -> ImageDeepfakeDetector:
+    """Get or create detector for the specified variant, loading off the event loop."""
+    try:
+        return await asyncio.to_thread(load_detector, variant)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, 
+            detail=f"Failed to load image detector ({variant}): {str(e)}"
+        )
+
+
+# One micro-batcher per variant: concurrent requests share a forward pass
+_batchers = {}
+
+async def get_batcher(variant: str = "vae") -> MicroBatcher:
+    """Get or create the micro-batcher for the specified variant."""
+    detector = await get_detector(variant)
+    close_batchers()
+    batcher = _batchers.get(variant)
+    if batcher is None or batcher.detector is not detector:
+        # (Re)create when the cache evicted and reloaded the detector
+        if batcher is not None:
+            batcher.close()
+        _batchers[variant] = MicroBatcher(
+            detector,
+            max_batch_size=settings.BATCH_MAX_SIZE,
+            timeout_ms=settings.BATCH_TIMEOUT_MS,
+        )
+    return _batchers[variant]
+
+
+def close_batchers() -> List[str]:
+    """
+    Close and drop the batchers of variants the model cache no longer holds.
+    
+    A batcher keeps its detector alive, so this is what lets an evicted
+    variant's weights be freed.
+    
+    Returns:
+        Variants whose batchers were closed
+    """
+    cached = set(model_cache.list_models())
+    evicted = [variant for variant in _batchers if f"image_genconvit_{variant}" not in cached]
+    for variant in evicted:
+        _batchers.pop(variant).close()
+    return evicted
 
 
 @router.post("/detect")
@@ -39,37 +91,36 @@ async def detect_image(
     
     Returns detection verdict, confidence score, and probability distribution.
     """
-    # 1. Validation: Ensure it's an image file
-    allowed_types = ["image/jpeg", "image/jpg", "image/png", "image/webp"]
-    if file.content_type not in allowed_types:
+    # 1. Validation: Ensure it's an image file and a known variant
+    if file.content_type not in _ALLOWED_TYPES:
         raise HTTPException(
             status_code=400, 
-            detail=f"Invalid file type: {file.content_type}. Allowed: {allowed_types}"
+            detail=f"Invalid file type: {file.content_type}. Allowed: {sorted(_ALLOWED_TYPES)}"
         )
-
-    # 2. Temporary Storage: Generate a unique ID to prevent collisions
-    temp_dir = "temp_uploads"
-    os.makedirs(temp_dir, exist_ok=True)
-    
-    # Preserve file extension for proper handling
-    file_ext = os.path.splitext(file.filename)[1] or ".jpg"
-    temp_path = os.path.join(temp_dir, f"{uuid.uuid4()}{file_ext}")
+    if variant not in _ALLOWED_VARIANTS:
+        raise HTTPException(status_code=400, detail=_BAD_VARIANT_DETAIL)
 
     try:
-        # 3. Intake: Stream to disk
-        with open(temp_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        # 2. Intake: decode straight from memory, no temp file round-trip
+        image_bytes = await file.read()
 
-        # 4. Get detector and run inference
-        detector = get_detector(variant)
-        results = detector.predict(temp_path)
+        # 3. Duplicate uploads are answered from the result cache
+        cache_key = ("image_detect", variant, content_digest(image_bytes))
+        results = result_cache.get(cache_key)
         
-        # Check for errors in results
-        if "error" in results:
-            raise HTTPException(status_code=500, detail=results["error"])
+        if results is None:
+            # Preprocess off the event loop, then join the variant's next batch
+            batcher = await get_batcher(variant)
+            tensor = await asyncio.to_thread(batcher.detector.preprocess_bytes, image_bytes)
+            if tensor is None:
+                raise HTTPException(status_code=500, detail="Could not process image.")
+            
+            results = await batcher.submit(tensor)
+            result_cache.put(cache_key, results)
         
-        # 5. Format response
-        return {
+        # 4. Format response (plain JSON types: serialize with orjson directly,
+        # skipping FastAPI's jsonable_encoder pass)
+        return ORJSONResponse({
             "status": "success",
             "filename": file.filename,
             "model": f"genconvit_{variant}",
@@ -81,15 +132,11 @@ async def detect_image(
                 "is_reliable": results["confidence"] >= 0.75,
                 "probabilities": results["probabilities"]
             }
-        }
+        })
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Detection failed: {str(e)}")
-    finally:
-        # 6. Cleanup: Always delete temp files
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
 
 
 @router.get("/health")
@@ -97,7 +144,7 @@ async def image_detection_health():
     """Check if image detection service is available."""
     try:
         # Try to initialize the default detector
-        detector = get_detector("vae")
+        detector = await get_detector("vae")
         return {
             "status": "healthy",
             "service": "image_detection",
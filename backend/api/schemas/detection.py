@@ -6,7 +6,12 @@ Inspired by DeepSafe's modular detection architecture.
 from pydantic import BaseModel, Field
 from typing import Optional, Dict, List, Any
 from enum import Enum
-from datetime import datetime
+import time
+
+
+def _now_ms() -> int:
+    """Current Unix time in milliseconds."""
+    return int(time.time() * 1000)
 
 
 class MediaType(str, Enum):
@@ -79,9 +84,9 @@ class DetectionResponse(BaseModel):
         default_factory=dict,
         description="Additional metadata about the analysis"
     )
-    timestamp: datetime = Field(
-        default_factory=datetime.utcnow,
-        description="Analysis timestamp"
+    timestamp_ms: int = Field(
+        default_factory=_now_ms,
+        description="Analysis timestamp (Unix epoch, milliseconds)"
     )
 
 
@@ -107,7 +112,7 @@ class BatchDetectionResponse(BaseModel):
         default=None,
         description="Total batch processing time"
     )
-    timestamp: datetime = Field(
-        default_factory=datetime.utcnow,
-        description="Batch analysis timestamp"
+    timestamp_ms: int = Field(
+        default_factory=_now_ms,
+        description="Batch analysis timestamp (Unix epoch, milliseconds)"
     )
@@ -6,14 +6,63 @@ This is a separate module from deepfake detection.
 """
 import os
 import json
-import base64
-from typing import Dict, Any, Optional
+from typing import AsyncIterator, Dict, Any, Optional
 import logging
 
+# pybase64 is a SIMD-accelerated drop-in for the stdlib decoder
+try:
+    import pybase64 as base64
+except ImportError:
+    import base64
+
+import orjson
+
 logger = logging.getLogger(__name__)
 
 
-from api.core.config import settings
+from api.core.config import get_settings
+
+settings = get_settings()
+
+MODEL_NAME = "gemini-2.0-flash-001"
+
+# Structured output schema; Gemini returns bare JSON matching it
+RESPONSE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "verdict": {
+            "type": "string",
+            "enum": ["AI_GENERATED", "LIKELY_REAL", "UNCERTAIN"],
+        },
+        "confidence": {"type": "number"},
+        "explanation": {"type": "string"},
+        "indicators": {"type": "array", "items": {"type": "string"}},
+    },
+    "required": ["verdict", "confidence", "explanation", "indicators"],
+}
+
+
+def _build_prompt(media_type: str) -> str:
+    """Build the analysis prompt for a media type."""
+    return f"""
+Analyze this {media_type}. Respond ONLY in JSON:
+{{
+  "verdict": "AI_GENERATED" | "LIKELY_REAL" | "UNCERTAIN",
+  "confidence": 0-100,
+  "explanation": "text",
+  "indicators": ["list"]
+}}
+"""
+
+
+PROMPTS = {media_type: _build_prompt(media_type) for media_type in ("image", "video")}
+
+
+def _sse(data: Dict[str, Any], event: Optional[str] = None) -> str:
+    """Format one Server-Sent Event with a JSON payload."""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {orjson.dumps(data).decode()}\n\n"
+
 
 class AIContentDetector:
     """
@@ -69,11 +118,17 @@ class AIContentDetector:
         
         try:
             import vertexai
-            from vertexai.generative_models import GenerativeModel
+            from vertexai.generative_models import GenerativeModel, GenerationConfig
             
             # Initialize Vertex AI
             vertexai.init(project=self.project_id, location=self.location)
-            self._model = GenerativeModel("gemini-2.0-flash-001")
+            self._model = GenerativeModel(
+                MODEL_NAME,
+                generation_config=GenerationConfig(
+                    response_mime_type="application/json",
+                    response_schema=RESPONSE_SCHEMA,
+                ),
+            )
             self._initialized = True
             
             logger.info(f"✅ Vertex AI initialized - Project: {self.project_id}")
@@ -115,25 +170,11 @@ class AIContentDetector:
             
             media_type = "image" if mime_type.startswith("image/") else "video"
             
-            prompt = f"""
-Analyze this {media_type}. Respond ONLY in JSON:
-{{
-  "verdict": "AI_GENERATED" | "LIKELY_REAL" | "UNCERTAIN",
-  "confidence": 0-100,
-  "explanation": "text",
-  "indicators": ["list"]
-}}
-"""
-            
             part = Part.from_data(file_data, mime_type=mime_type)
-            response = self._model.generate_content([prompt, part])
-            
-            # Parse response
-            raw = response.text.strip()
-            if raw.startswith("```"):
-                raw = raw.replace("```json", "").replace("```", "").strip()
+            response = await self._model.generate_content_async([PROMPTS[media_type], part])
             
-            result = json.loads(raw)
+            # JSON mode: the response text is the JSON document itself
+            result = orjson.loads(response.text)
             
             return {
                 "success": True,
@@ -154,6 +195,48 @@ Analyze this {media_type}. Respond ONLY in JSON:
                 "error": str(e)
             }
     
+    async def analyze_stream(
+        self,
+        file_data: bytes,
+        mime_type: str = "image/jpeg"
+    ) -> AsyncIterator[str]:
+        """
+        Analyze media, streaming the model output as Server-Sent Events.
+        
+        Each event carries a `{"text": ...}` fragment of the JSON verdict
+        as soon as Gemini produces it; the client concatenates fragments
+        and parses the result after the final `done` event.
+        
+        Args:
+            file_data: Raw file bytes
+            mime_type: MIME type of the file
+            
+        Yields:
+            SSE-formatted event strings
+        """
+        if not self._initialized and not self.initialize():
+            yield _sse({"error": "AI Content Detection requires GCP credentials."}, event="error")
+            return
+        
+        try:
+            from vertexai.generative_models import Part
+            
+            media_type = "image" if mime_type.startswith("image/") else "video"
+            part = Part.from_data(file_data, mime_type=mime_type)
+            
+            responses = await self._model.generate_content_async(
+                [PROMPTS[media_type], part],
+                stream=True
+            )
+            async for chunk in responses:
+                yield _sse({"text": chunk.text})
+            
+            yield _sse({"media_type": media_type}, event="done")
+            
+        except Exception as e:
+            logger.error(f"AI analysis stream failed: {e}")
+            yield _sse({"error": str(e)}, event="error")
+    
     async def analyze_base64(
         self,
         base64_data: str,
@@ -170,7 +253,7 @@ Analyze this {media_type}. Respond ONLY in JSON:
             Detection result
         """
         try:
-            file_data = base64.b64decode(base64_data)
+            file_data = base64.b64decode(base64_data, validate=False)
             return await self.analyze(file_data, mime_type)
         except Exception as e:
             return {
@@ -184,7 +267,7 @@ Analyze this {media_type}. Respond ONLY in JSON:
             "initialized": self._initialized,
             "project": self.project_id or "not_set",
             "location": self.location,
-            "model": "gemini-2.0-flash-001" if self._initialized else None
+            "model": MODEL_NAME if self._initialized else None
         }
 
 
@@ -4,10 +4,13 @@ Base Detector - Abstract base class for all deepfake detection models.
 Following DeepSafe's modular architecture pattern where each detector
 is isolated and follows a common interface.
 """
+import asyncio
+import pickle
 from abc import ABC, abstractmethod
-from typing import Optional, Dict, Any, Union
+from typing import Optional, Dict, Any, List, Union
 from pathlib import Path
 import numpy as np
+import torch
 from PIL import Image
 
 
@@ -19,12 +22,17 @@ class BaseDetector(ABC):
     and implement the required abstract methods.
     """
     
+    # Approximate GPU memory (weights + activations + workspace) for
+    # device placement; 0 means unknown and keeps the detector on CPU
+    memory_estimate: int = 0
+    
     def __init__(
         self,
         model_name: str,
         model_path: Optional[Path] = None,
         device: str = "cpu",
         confidence_threshold: float = 0.5,
+        quantize: bool = False,
     ):
         """
         Initialize the detector.
@@ -34,19 +42,83 @@ class BaseDetector(ABC):
             model_path: Path to model weights
             device: Compute device ('cpu', 'cuda', 'mps')
             confidence_threshold: Default threshold for predictions
+            quantize: Dynamically quantize Linear layers to int8 on CPU
         """
         self.model_name = model_name
         self.model_path = model_path
         self.device = device
         self.confidence_threshold = confidence_threshold
+        self.quantize = quantize
         self.model = None
         self._is_loaded = False
+        self._load_lock = asyncio.Lock()
     
     @property
     def is_loaded(self) -> bool:
         """Check if model is loaded and ready for inference."""
         return self._is_loaded
     
+    async def ensure_loaded(self) -> None:
+        """
+        Load the model off the event loop if it isn't loaded yet.
+        
+        Concurrent first requests wait on a single load_model() call
+        instead of each starting their own; once loaded this is just
+        a flag check.
+        """
+        if self._is_loaded:
+            return
+        async with self._load_lock:
+            if not self._is_loaded:
+                await asyncio.to_thread(self.load_model)
+    
+    def _load_weights(self, path: Path) -> Dict[str, Any]:
+        """
+        Load a state dict memory-mapped on CPU.
+        
+        Tensors stay backed by the checkpoint's page cache, so workers
+        forked from a preloading master share them copy-on-write instead
+        of each holding a private copy. Pair with
+        load_state_dict(..., assign=True) to keep the mapping.
+        
+        Checkpoints are read with weights_only; the bundled ones that also
+        pickle non-tensor objects are retried with a full unpickle.
+        
+        Args:
+            path: Checkpoint saved with torch.save (zipfile format)
+            
+        Returns:
+            State dict of mmap-backed tensors
+        """
+        try:
+            return torch.load(path, map_location="cpu", mmap=True, weights_only=True)
+        except pickle.UnpicklingError:
+            return torch.load(path, map_location="cpu", mmap=True, weights_only=False)
+    
+    @property
+    def is_quantized(self) -> bool:
+        """Whether load_model() applies int8 dynamic quantization."""
+        return self.quantize and str(self.device) == "cpu"
+    
+    def _quantize_dynamic(self, module: torch.nn.Module) -> torch.nn.Module:
+        """
+        Quantize a module's Linear layers to int8 if enabled.
+        
+        Dynamic quantization only runs on CPU and quantized layers have no
+        backward pass, so gradient-based heatmaps are unavailable.
+        
+        Args:
+            module: FP32 module in eval mode
+            
+        Returns:
+            Quantized module, or the input unchanged when disabled
+        """
+        if not self.is_quantized:
+            return module
+        return torch.ao.quantization.quantize_dynamic(
+            module, {torch.nn.Linear}, dtype=torch.qint8
+        )
+    
     @abstractmethod
     def load_model(self) -> None:
         """
@@ -85,12 +157,60 @@ class BaseDetector(ABC):
         """
         pass
     
-    def detect(self, image: Union[Image.Image, np.ndarray, str, Path]) -> Dict[str, Any]:
+    def predict_batch(self, input_batch: Any) -> List[Dict[str, Any]]:
+        """
+        Run inference on a batch of preprocessed inputs.
+        
+        The default implementation calls predict() once per sample;
+        detectors whose model supports batched forward passes should
+        override this.
+        
+        Args:
+            input_batch: Preprocessed inputs stacked along dim 0
+            
+        Returns:
+            One result dict per input, in order
+        """
+        return [self.predict(input_batch[i:i + 1]) for i in range(len(input_batch))]
+    
+    @property
+    def supports_heatmap(self) -> bool:
+        """Whether heatmap() can produce a visualization."""
+        return False
+    
+    def heatmap(self, input_data: Any, result: Dict[str, Any]) -> Optional[str]:
+        """
+        Generate a heatmap for a prediction, separately from predict().
+        
+        Heatmaps typically need an extra backward pass, so they are only
+        computed when a caller asks for one.
+        
+        Args:
+            input_data: Preprocessed input passed to predict()
+            result: The result predict() returned for it
+            
+        Returns:
+            Base64 encoded PNG data URL, or None
+        """
+        return None
+    
+    def predict_with_heatmap(self, input_data: Any) -> Dict[str, Any]:
+        """Run predict() and attach heatmap_base64."""
+        result = self.predict(input_data)
+        result["heatmap_base64"] = self.heatmap(input_data, result) if self.supports_heatmap else None
+        return result
+    
+    def detect(
+        self,
+        image: Union[Image.Image, np.ndarray, str, Path],
+        include_heatmap: bool = False,
+    ) -> Dict[str, Any]:
         """
         Full detection pipeline: load image -> preprocess -> predict.
         
         Args:
             image: Image as PIL Image, numpy array, or path
+            include_heatmap: Also generate heatmap_base64
             
         Returns:
             Detection result dictionary
@@ -106,7 +226,10 @@ class BaseDetector(ABC):
         
         # Run pipeline
         preprocessed = self.preprocess(image)
-        result = self.predict(preprocessed)
+        if include_heatmap:
+            result = self.predict_with_heatmap(preprocessed)
+        else:
+            result = self.predict(preprocessed)
         
         # Add metadata
         result["model_name"] = self.model_name
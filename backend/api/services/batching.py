@@ -0,0 +1,245 @@
+"""
+Micro-batching - Coalesces concurrent inference requests into batched forward passes.
+
+Each request submits a preprocessed tensor and awaits its own result; a
+background collector groups whatever is queued into a single batch so the
+model runs once for many requests instead of once per request. Items are
+single images by default, or whole clips of frames (clips=True).
+"""
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import torch
+
+from api.services.base import BaseDetector
+from api.services.inference_pool import run_in_thread
+
+logger = logging.getLogger(__name__)
+
+
+def bucket_sizes(max_size: int, smallest: int = 1) -> List[int]:
+    """
+    Batch sizes a compiled model is padded to: smallest, doubling up to max_size.
+
+    torch.compile (and its CUDA graphs, in reduce-overhead mode) specializes
+    on the batch size, so padding every batch up to one of these bounds the
+    recompiles and graph captures to a few shapes, with the compiles paid by
+    the warm-up.
+
+    Args:
+        max_size: Largest batch the model is expected to see
+        smallest: Smallest bucket
+
+    Returns:
+        Increasing bucket sizes, ending at max_size
+    """
+    sizes = [max(1, min(smallest, max_size))]
+    while sizes[-1] < max_size:
+        sizes.append(min(sizes[-1] * 2, max_size))
+    return sizes
+
+
+def pad_to_bucket(batch: torch.Tensor, buckets: List[int]) -> torch.Tensor:
+    """
+    Zero-pad a batch along dim 0 up to the smallest bucket that holds it.
+
+    The padding rows are scored and discarded by the caller; batches larger
+    than every bucket are returned as is.
+
+    Args:
+        batch: Input batch (N, ...)
+        buckets: Sizes from bucket_sizes()
+
+    Returns:
+        Batch with bucket-size rows, the first N being the input
+    """
+    size = next((bucket for bucket in buckets if bucket >= batch.shape[0]), batch.shape[0])
+    if size == batch.shape[0]:
+        return batch
+
+    padded = batch.new_zeros((size, *batch.shape[1:]))
+    if batch.dim() == 4 and batch.is_contiguous(memory_format=torch.channels_last):
+        padded = padded.contiguous(memory_format=torch.channels_last)
+    padded[:batch.shape[0]] = batch
+    return padded
+
+
+class MicroBatcher:
+    """
+    Asyncio micro-batcher in front of a single detector.
+
+    The collector waits for the first queued item, then keeps pulling
+    until either `max_batch_size` items are gathered or `timeout_ms`
+    has elapsed, and dispatches the batch to `detector.predict_batch`
+    on the inference thread pool.
+    """
+
+    def __init__(
+        self,
+        detector: BaseDetector,
+        max_batch_size: int = 8,
+        timeout_ms: float = 15.0,
+        slots: Optional[asyncio.Semaphore] = None,
+        streams: Optional[asyncio.Queue] = None,
+        clips: bool = False,
+    ):
+        """
+        Initialize the batcher.
+
+        Args:
+            detector: Loaded detector implementing predict_batch()
+            max_batch_size: Maximum number of items per forward pass
+            timeout_ms: Maximum time to wait for a batch to fill
+            slots: Semaphore capping concurrent in-flight batches
+            streams: Pool of CUDA streams to run batches on (GPU detectors)
+            clips: Items are (N_i, C, H, W) clips; predict_batch() also
+                gets each item's frame count and returns one result per clip
+        """
+        self.detector = detector
+        self.max_batch_size = max_batch_size
+        self.timeout_ms = timeout_ms
+        self._slots = slots or asyncio.Semaphore(1)
+        self._streams = streams
+        self.clips = clips
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._collector: Optional[asyncio.Task] = None
+        self._collecting: List[Tuple[torch.Tensor, asyncio.Future]] = []
+        self._inflight: Set[asyncio.Task] = set()
+
+    async def submit(self, tensor: torch.Tensor) -> Dict[str, Any]:
+        """
+        Queue a preprocessed (1, C, H, W) tensor (or (N, C, H, W) clip) and wait for its result.
+
+        Args:
+            tensor: Preprocessed input from detector.preprocess()
+
+        Returns:
+            Detection result for this input
+        """
+        self._ensure_collector()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((tensor, future))
+        return await future
+
+    def _ensure_collector(self) -> None:
+        """Start the collector task on first use (needs a running loop)."""
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        if self._collector is None or self._collector.done():
+            self._collector = asyncio.get_running_loop().create_task(self._collect_loop())
+
+    def close(self) -> None:
+        """
+        Stop the collector and fail every request that hasn't reached a batch.
+
+        Batches already running finish normally. Call from the event loop
+        before dropping the batcher, so its model can be freed and the
+        collector task isn't destroyed while pending.
+        """
+        error = RuntimeError(f"{self.detector.model_name} was unloaded")
+        if self._collector is not None:
+            self._collector.cancel()
+            self._collector = None
+        self._fail(self._collecting, error)
+        self._collecting = []
+        while self._queue is not None and not self._queue.empty():
+            self._fail([self._queue.get_nowait()], error)
+
+    @staticmethod
+    def _fail(items: List[Tuple[torch.Tensor, asyncio.Future]], error: Exception) -> None:
+        """Set error on every unresolved future of items."""
+        for _, future in items:
+            if not future.done():
+                future.set_exception(error)
+
+    async def _collect(self) -> List[Tuple[torch.Tensor, asyncio.Future]]:
+        """Gather up to max_batch_size items or until the timeout expires."""
+        # Kept on self while gathering, so close() can fail them
+        items = self._collecting = [await self._queue.get()]
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout_ms / 1000
+
+        while len(items) < self.max_batch_size:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                items.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+
+        return items
+
+    async def _collect_loop(self) -> None:
+        """Form batches forever, holding a slot for each in-flight batch."""
+        while True:
+            items = await self._collect()
+            await self._slots.acquire()
+            task = asyncio.get_running_loop().create_task(self._run_batch(items))
+            self._collecting = []
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _run_batch(self, items: List[Tuple[torch.Tensor, asyncio.Future]]) -> None:
+        """Run one batched forward pass and resolve each item's future."""
+        try:
+            batch = torch.cat([tensor for tensor, _ in items])
+            sizes = [tensor.shape[0] for tensor, _ in items] if self.clips else None
+            if self._streams is None:
+                results = await run_in_thread(self._predict, batch, sizes)
+            else:
+                stream = await self._streams.get()
+                try:
+                    results = await run_in_thread(self._predict_on_stream, batch, sizes, stream)
+                finally:
+                    self._streams.put_nowait(stream)
+        except Exception as e:
+            logger.error(f"Batch inference failed for {self.detector.model_name}: {e}")
+            self._fail(items, e)
+            return
+        finally:
+            self._slots.release()
+
+        if len(results) != len(items):
+            # zip() would leave the extra requests waiting forever
+            error = RuntimeError(
+                f"{self.detector.model_name} returned {len(results)} results for {len(items)} inputs"
+            )
+            logger.error(f"Batch inference failed: {error}")
+            self._fail(items, error)
+            return
+
+        for (_, future), result in zip(items, results):
+            if not future.done():
+                future.set_result(result)
+
+    def _predict(self, batch: torch.Tensor, sizes: Optional[List[int]]) -> List[Dict[str, Any]]:
+        """Call predict_batch, passing clip sizes in clip mode."""
+        if sizes is None:
+            return self.detector.predict_batch(batch)
+        return self.detector.predict_batch(batch, sizes)
+    
+    def _predict_on_stream(
+        self,
+        batch: torch.Tensor,
+        sizes: Optional[List[int]],
+        stream: "torch.cuda.Stream",
+    ) -> List[Dict[str, Any]]:
+        """
+        Run predict_batch on a CUDA stream and wait for its kernels.
+
+        Inputs are produced on the device's default stream (uploads hand
+        off there, and torch.cat runs there), so the side stream waits on
+        it before the forward, and the batch is recorded on the side
+        stream so the allocator doesn't reuse it while still being read.
+        """
+        if batch.is_cuda:
+            stream.wait_stream(torch.cuda.default_stream(batch.device))
+            batch.record_stream(stream)
+        with torch.cuda.stream(stream):
+            results = self._predict(batch, sizes)
+        stream.synchronize()
+        return results
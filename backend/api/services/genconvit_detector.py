@@ -4,17 +4,21 @@ GenConViT Deepfake Detector (Adapted for ED Variant)
 Implementation maps to GenConViTED model for video deepfake detection.
 """
 import time
-from typing import Dict, Any, Optional, List
+import types
+from typing import Dict, Any, Optional, List, Union
 from pathlib import Path
 import logging
 
+import cv2
 import torch
 import torch.nn.functional as F
-from torchvision import transforms
 from PIL import Image
 import numpy as np
 
+from api.core.config import get_settings
 from api.services.base import BaseDetector
+from api.services.batching import bucket_sizes, pad_to_bucket
+from api.services.inference_pool import compile_mode
 
 # Import from the specific model file we identified
 try:
@@ -25,6 +29,63 @@ except ImportError as e:
     GenConViTED = None
 
 logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+def _sdpa_window_attention(self, x: torch.Tensor, mask: Optional[torch.Tensor] = None) -> torch.Tensor:
+    """
+    timm WindowAttention.forward on F.scaled_dot_product_attention.
+    
+    Same math as the original (the relative-position bias and shift mask
+    become an additive attn_mask), but QK^T, softmax and AV run as one
+    fused flash / memory-efficient kernel.
+    """
+    B_, N, _ = x.shape
+    qkv = self.qkv(x).reshape(B_, N, 3, self.num_heads, -1).permute(2, 0, 3, 1, 4)
+    q, k, v = qkv.unbind(0)
+    
+    bias = self._sdpa_bias  # (1, nH, N, N)
+    if mask is not None:
+        num_win = mask.shape[0]
+        bias = bias.unsqueeze(1) + mask.unsqueeze(1).unsqueeze(0)  # (1, nW, nH, N, N)
+        bias = bias.expand(B_ // num_win, -1, -1, -1, -1).reshape(B_, self.num_heads, N, N)
+    
+    x = F.scaled_dot_product_attention(q, k, v, attn_mask=bias.to(q.dtype))
+    x = x.transpose(1, 2).reshape(B_, N, -1)
+    x = self.proj(x)
+    x = self.proj_drop(x)
+    return x
+
+
+def use_sdpa_attention(model: torch.nn.Module) -> int:
+    """
+    Switch a model's timm Swin window attention to scaled_dot_product_attention.
+    
+    Inference only: the relative-position bias is gathered once here and
+    cached on each module, so call this after the weights are loaded and
+    moved to their device.
+    
+    Args:
+        model: Model containing timm WindowAttention modules
+        
+    Returns:
+        Number of attention modules patched
+    """
+    if not hasattr(F, "scaled_dot_product_attention"):
+        return 0
+    try:
+        from timm.models.swin_transformer import WindowAttention
+    except ImportError:
+        return 0
+    
+    patched = 0
+    for module in model.modules():
+        if isinstance(module, WindowAttention):
+            with torch.no_grad():
+                module._sdpa_bias = module._get_rel_pos_bias().detach()
+            module.forward = types.MethodType(_sdpa_window_attention, module)
+            patched += 1
+    return patched
 
 class GenConViTDetector(BaseDetector):
     """
@@ -38,6 +99,11 @@ class GenConViTDetector(BaseDetector):
         device: str = "cpu",
         confidence_threshold: float = 0.5,
         num_frames: int = 15,
+        max_frames: int = 30,
+        compile: Optional[bool] = None,
+        freeze: Optional[bool] = None,
+        engine_path: Optional[Path] = None,
+        use_onnx: Optional[bool] = None,
     ):
         super().__init__(
             model_name="genconvit_detector",
@@ -47,23 +113,31 @@ class GenConViTDetector(BaseDetector):
         )
         
         self.num_frames = num_frames
+        self.max_frames = max(max_frames, num_frames)
+        self.compile = settings.TORCH_COMPILE if compile is None else compile
+        self.freeze = settings.JIT_FREEZE if freeze is None else freeze
+        if engine_path is None and settings.GENCONVIT_TRT_ENGINE:
+            engine_path = Path(settings.GENCONVIT_TRT_ENGINE)
+        self.engine_path = engine_path
+        self.trt_module = None
+        self.use_onnx = settings.ONNX_RUNTIME if use_onnx is None else use_onnx
+        self.session = None
+        self._copy_stream = None
+        self._buckets: Optional[List[int]] = None  # Padded frame counts when compiled
         
-        # Preprocessing for GenConViT
+        # Preprocessing for GenConViT (done batched on self.device)
         # Note: model expects 224x224
-        self.transform = transforms.Compose([
-            transforms.Resize((224, 224)),
-            transforms.ToTensor(),
-            # Normalization might be needed. config.yaml doesn't specify, 
-            # but pred_func.py uses normalize_data()["vid"].
-            # Assuming standard ImageNet or similar if calling timm.
-            transforms.Normalize(
-                mean=[0.485, 0.456, 0.406],
-                std=[0.229, 0.224, 0.225]
-            )
-        ])
+        # Normalization might be needed. config.yaml doesn't specify, 
+        # but pred_func.py uses normalize_data()["vid"].
+        # Assuming standard ImageNet or similar if calling timm.
+        self.input_size = (224, 224)
+        self.mean = torch.tensor([0.485, 0.456, 0.406], device=device).view(1, 3, 1, 1)
+        self.std = torch.tensor([0.229, 0.224, 0.225], device=device).view(1, 3, 1, 1)
 
     def load_model(self) -> None:
         """Load the GenConViT model."""
+        if self._is_loaded:
+            return
         if GenConViTED is None:
             raise ImportError("GenConViTED class could not be imported.")
             
@@ -89,10 +163,8 @@ class GenConViTDetector(BaseDetector):
                      # But model_path should be correct if passed from main
                      pass
                 
-                checkpoint = torch.load(
-                    self.model_path,
-                    map_location=self.device
-                )
+                # mmap'd on CPU: only touched pages are read, no full host copy
+                checkpoint = self._load_weights(self.model_path)
                 
                 # Handle different checkpoint formats
                 if isinstance(checkpoint, dict) and 'state_dict' in checkpoint:
@@ -100,47 +172,290 @@ class GenConViTDetector(BaseDetector):
                 else:
                     state_dict = checkpoint
                     
-                self.model.load_state_dict(state_dict, strict=False) # strict=False to be safe with auxiliary keys
+                self.model.load_state_dict(state_dict, strict=False, assign=True) # strict=False to be safe with auxiliary keys
             else:
                 logger.warning("No model path provided for GenConViT. Using random initialization.")
             
             self.model.to(self.device)
             self.model.eval()
+            
+            # NHWC matches ConvNeXt's depthwise convs and cuDNN's preferred layout
+            self.model = self.model.to(memory_format=torch.channels_last)
+            
+            # Fused attention kernels for the Swin embedder
+            use_sdpa_attention(self.model)
+            
+            if torch.device(self.device).type == "cuda":
+                # Uploads run here so they overlap with forwards on other streams
+                self._copy_stream = torch.cuda.Stream(device=self.device)
+            
+            if self.engine_path and torch.device(self.device).type == "cuda":
+                self._load_trt_module()
+            elif self.use_onnx and torch.device(self.device).type == "cpu":
+                self._init_onnx()
+            if self.trt_module is None and self.session is None:
+                if self.compile:
+                    self._compile_model()
+                elif self.freeze and torch.device(self.device).type == "cpu":
+                    self._freeze_model()
+            
             self._is_loaded = True
             
         except Exception as e:
             logger.error(f"Failed to load GenConViT model: {e}")
             raise
 
+    def _load_trt_module(self) -> None:
+        """
+        Load the fp16 Torch-TensorRT module, building and saving it first if needed.
+        
+        The engine covers 1 frame up to a full batch of max_frames clips,
+        optimized for one num_frames clip.
+        Falls back to the PyTorch model if torch_tensorrt is missing or the
+        build fails.
+        """
+        try:
+            import torch_tensorrt
+        except ImportError:
+            logger.warning("torch_tensorrt not installed, using PyTorch for GenConViT")
+            return
+        
+        try:
+            if self.engine_path.exists():
+                self.trt_module = torch.jit.load(str(self.engine_path), map_location=self.device)
+            else:
+                self.trt_module = torch_tensorrt.compile(
+                    self.model,
+                    ir="ts",
+                    inputs=[torch_tensorrt.Input(
+                        min_shape=(1, 3, 224, 224),
+                        opt_shape=(self.num_frames, 3, 224, 224),
+                        max_shape=(self.max_frames * max(1, settings.VIDEO_BATCH_MAX_SIZE), 3, 224, 224),
+                        dtype=torch.half,
+                    )],
+                    enabled_precisions={torch.half},
+                )
+                self.engine_path.parent.mkdir(parents=True, exist_ok=True)
+                torch.jit.save(self.trt_module, str(self.engine_path))
+                logger.info(f"Saved GenConViT TensorRT module to {self.engine_path}")
+        except Exception as e:
+            self.trt_module = None
+            logger.warning(f"GenConViT TensorRT build/load failed, using PyTorch: {e}")
+    
+    def _init_onnx(self) -> None:
+        """
+        Export the model to ONNX once and open a CPU onnxruntime session on it.
+        
+        Uses the OpenVINO execution provider when installed, else ORT's CPU
+        provider. The frame dimension is dynamic. Falls back to PyTorch if
+        onnxruntime is missing or the export fails.
+        """
+        try:
+            import onnxruntime as ort
+        except ImportError:
+            logger.warning("onnxruntime not installed, using PyTorch for GenConViT")
+            return
+        
+        try:
+            cache_dir = Path(settings.ONNX_CACHE_DIR)
+            cache_dir.mkdir(parents=True, exist_ok=True)
+            stem = self.model_path.stem if self.model_path else "random"
+            onnx_path = cache_dir / f"{stem}.onnx"
+            
+            if not onnx_path.exists():
+                dummy = torch.zeros(self.num_frames, 3, 224, 224)
+                torch.onnx.export(
+                    self.model,
+                    dummy,
+                    str(onnx_path),
+                    input_names=["frames"],
+                    output_names=["logits"],
+                    opset_version=17,
+                    dynamic_axes={"frames": {0: "frames"}, "logits": {0: "frames"}},
+                )
+                logger.info(f"Exported GenConViT to {onnx_path}")
+            
+            providers = ["CPUExecutionProvider"]
+            if "OpenVINOExecutionProvider" in ort.get_available_providers():
+                providers.insert(0, "OpenVINOExecutionProvider")
+            
+            self.session = ort.InferenceSession(str(onnx_path), providers=providers)
+            logger.info(f"GenConViT ONNX session ({self.session.get_providers()[0]})")
+        except Exception as e:
+            self.session = None
+            logger.warning(f"GenConViT ONNX export/session failed, using PyTorch: {e}")
+    
+    def _compile_model(self) -> None:
+        """
+        Compile the ConvNeXt + Swin forward and warm it up on every bucket.
+        
+        Batches are padded to a few fixed frame counts (num_frames,
+        doubling up to a full clip batch of max_frames each), so the
+        warm-up pays every Dynamo/Inductor compile at load time instead
+        of on live requests. See compile_mode() for when CUDA graphs are used.
+        """
+        device_type = torch.device(self.device).type
+        self.model = torch.compile(
+            self.model,
+            mode=compile_mode(device_type),
+            fullgraph=False,
+            dynamic=False,
+        )
+        self._buckets = bucket_sizes(
+            self.max_frames * max(1, settings.VIDEO_BATCH_MAX_SIZE), self.num_frames
+        )
+        
+        with torch.inference_mode(), torch.autocast(
+            device_type=device_type,
+            dtype=torch.float16,
+            enabled=device_type == "cuda",
+        ):
+            for size in self._buckets:
+                dummy = torch.zeros(size, 3, 224, 224, device=self.device).to(
+                    memory_format=torch.channels_last
+                )
+                self.model(dummy)
+        logger.info(f"GenConViT compiled for {self._buckets} frames")
+    
+    def _freeze_model(self) -> None:
+        """
+        Trace, freeze and optimize the model for CPU inference.
+        
+        Freezing folds parameters into constants, which lets
+        optimize_for_inference fuse conv/bias/activation chains and pre-pack
+        weights for oneDNN. GenConViTED (timm backbones) doesn't script, so
+        it is traced on a dummy clip; the frame dimension stays dynamic.
+        Falls back to eager on failure.
+        """
+        dummy = torch.zeros(self.num_frames, 3, 224, 224).to(memory_format=torch.channels_last)
+        try:
+            with torch.no_grad():
+                traced = torch.jit.trace(self.model, dummy, check_trace=False)
+                frozen = torch.jit.optimize_for_inference(traced)
+                frozen(dummy)
+            self.model = frozen
+            logger.info("GenConViT frozen for CPU inference")
+        except Exception as e:
+            logger.warning(f"GenConViT freeze failed, using eager: {e}")
+    
     def preprocess(self, image: Image.Image) -> torch.Tensor:
         """Preprocess a single frame."""
-        if image.mode != 'RGB':
-            image = image.convert('RGB')
-        return self.transform(image)
+        return self.preprocess_frames([image])[0]
     
-    def preprocess_frames(self, frames: List[Image.Image]) -> torch.Tensor:
+    def preprocess_frames(self, frames: List[Union[Image.Image, np.ndarray]]) -> torch.Tensor:
         """
         Preprocess a list of video frames.
+        
+        Frames may be PIL images or HWC uint8 RGB arrays; arrays skip the
+        PIL round trip entirely.
         Returns: (num_frames, C, H, W) -> Batch for the model
         """
-        processed = [self.preprocess(frame) for frame in frames]
+        arrays = [
+            frame if isinstance(frame, np.ndarray)
+            else np.asarray(frame if frame.mode == 'RGB' else frame.convert('RGB'))
+            for frame in frames
+        ]
+        
+        # Frames of one video share a size; resize any stragglers so they stack
+        height, width = arrays[0].shape[:2]
+        arrays = [
+            array if array.shape[:2] == (height, width) else cv2.resize(array, (width, height))
+            for array in arrays
+        ]
+        
+        # One uint8 (N, H, W, 3) upload; the NHWC permute is already channels_last
+        if self._copy_stream is None:
+            return self._resize_normalize(self._upload(arrays).permute(0, 3, 1, 2))
+        
+        # Upload and resize on the copy stream, overlapping forwards on other
+        # streams, then hand the result to the default stream: that is where
+        # MicroBatcher's side streams (and direct predict calls) wait for inputs
+        with torch.cuda.stream(self._copy_stream):
+            frames_tensor = self._resize_normalize(self._upload(arrays).permute(0, 3, 1, 2))
+        
+        handoff = torch.cuda.default_stream(self.device)
+        handoff.wait_stream(self._copy_stream)
+        frames_tensor.record_stream(handoff)
+        return frames_tensor
+    
+    def _resize_normalize(self, frames_tensor: torch.Tensor) -> torch.Tensor:
+        """uint8 (N, 3, H, W) on device -> normalized 224x224 float, channels_last."""
+        frames_tensor = frames_tensor.float().div_(255)
+        frames_tensor = F.interpolate(
+            frames_tensor,
+            size=self.input_size,
+            mode="bilinear",
+            align_corners=False,
+            antialias=True,
+        )
+        frames_tensor = frames_tensor.sub_(self.mean).div_(self.std)
+        return frames_tensor.contiguous(memory_format=torch.channels_last)
+    
+    def _upload(self, arrays: List[np.ndarray]) -> torch.Tensor:
+        """
+        Stack HWC uint8 frames and move them to the device.
         
-        # Stack into batch
-        frames_tensor = torch.stack(processed)
-        return frames_tensor.to(self.device)
+        On GPU the frames are stacked straight into pinned memory and copied
+        asynchronously on the current stream (the copy stream, from
+        preprocess_frames).
+        """
+        if self._copy_stream is None:
+            return torch.from_numpy(np.stack(arrays)).to(self.device)
+        
+        host = torch.empty((len(arrays), *arrays[0].shape), dtype=torch.uint8, pin_memory=True)
+        np.stack(arrays, out=host.numpy())
+        return host.to(self.device, non_blocking=True)
     
-    def predict(self, input_data: torch.Tensor) -> Dict[str, Any]:
+    def predict(self, input_data: torch.Tensor, return_raw: bool = False) -> Dict[str, Any]:
         """
         Run inference on batch of frames.
         Args:
             input_data: (num_frames, C, H, W)
+            return_raw: Include per-frame probabilities as raw_output
+        """
+        return self.predict_batch(input_data, [input_data.shape[0]], return_raw)[0]
+    
+    def predict_batch(
+        self,
+        input_batch: torch.Tensor,
+        sizes: Optional[List[int]] = None,
+        return_raw: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """
+        Run one forward pass over the frames of several clips.
+        
+        Args:
+            input_batch: Frames of all clips concatenated, (sum(sizes), C, H, W)
+            sizes: Frame count of each clip, in order (default: one frame per clip)
+            return_raw: Include per-frame probabilities as raw_output
+            
+        Returns:
+            One result dict per clip, in order
         """
         start_time = time.time()
+        if sizes is None:
+            sizes = [1] * input_batch.shape[0]
         
-        with torch.no_grad():
+        # fp16 autocast on GPU only (LayerNorm/softmax stay fp32); CPU stays fp32
+        device_type = torch.device(self.device).type
+        with torch.inference_mode(), torch.autocast(
+            device_type=device_type,
+            dtype=torch.float16,
+            enabled=device_type == "cuda",
+        ):
             # GenConViTED forward takes (N, C, H, W) and returns (N, num_classes)
-            logits = self.model(input_data)
-            probs = F.softmax(logits, dim=1) # (N, 2)
+            if self.trt_module is not None:
+                logits = self.trt_module(input_batch.half())
+            elif self.session is not None:
+                # ORT takes a contiguous NCHW float32 host array
+                frames = input_batch.contiguous().numpy()
+                logits = torch.from_numpy(self.session.run(None, {"frames": frames})[0])
+            elif self._buckets is not None:
+                # Padded to a warmed-up shape; the padding frames are dropped
+                logits = self.model(pad_to_bucket(input_batch, self._buckets))[:input_batch.shape[0]]
+            else:
+                logits = self.model(input_batch)
+            probs = F.softmax(logits.float(), dim=1) # (N, 2)
             
             # Simple averaging of frame probabilities
             # Column 0: Real?, Column 1: Fake?
@@ -168,32 +483,42 @@ class GenConViTDetector(BaseDetector):
             # If pred=0 -> returns 1 -> FAKE.
             # So Index 0 IS FAKE.
             
-            fake_prob = probs[:, 0].mean().item()
-            real_prob = probs[:, 1].mean().item()
-            
-            # Let's double check this logic.
-            # If max_prediction_value returns 0 (index 0 is max), then it maps to FAKE.
-            # So yes, Index 0 is FAKE PROBABILITY.
-            
+            # A single device->host copy for every clip in the batch; the
+            # per-clip means are then taken on the host from `sizes`
+            clips = probs.cpu().split(sizes)
+            means = [clip.mean(dim=0).tolist() for clip in clips]
+        
+        raw = clips if return_raw else None
         processing_time = (time.time() - start_time) * 1000
         
-        is_fake = fake_prob > real_prob # Simple argmax logic equivalent
-        if self.confidence_threshold:
-             is_fake = fake_prob >= self.confidence_threshold
-
-        return {
-            "is_fake": is_fake,
-            "confidence": fake_prob if is_fake else real_prob,
-            "fake_probability": fake_prob,
-            "real_probability": real_prob,
-            "processing_time_ms": processing_time,
-            "num_frames_analyzed": input_data.shape[0],
-            "raw_output": probs.cpu().numpy().tolist()
-        }
+        results = []
+        for i, (fake_prob, real_prob) in enumerate(means):
+            is_fake = fake_prob > real_prob # Simple argmax logic equivalent
+            if self.confidence_threshold:
+                 is_fake = fake_prob >= self.confidence_threshold
+            
+            result = {
+                "is_fake": is_fake,
+                "confidence": fake_prob if is_fake else real_prob,
+                "fake_probability": fake_prob,
+                "real_probability": real_prob,
+                "processing_time_ms": processing_time,
+                "num_frames_analyzed": sizes[i],
+            }
+            if raw is not None:
+                result["raw_output"] = raw[i].tolist()
+            results.append(result)
+        return results
 
-    def detect_video(self, frames: List[Image.Image]) -> Dict[str, Any]:
+    def detect_video(
+        self,
+        frames: List[Union[Image.Image, np.ndarray]],
+        return_raw: bool = False,
+    ) -> Dict[str, Any]:
         """
-        Detect deepfake in video frames.
+        Detect deepfake in video frames (images or RGB arrays).
+        
+        Set return_raw to also get per-frame probabilities (debugging).
         """
         if not self.is_loaded:
             self.load_model()
@@ -202,7 +527,7 @@ class GenConViTDetector(BaseDetector):
         frames_tensor = self.preprocess_frames(frames)
         
         # Run prediction
-        result = self.predict(frames_tensor)
+        result = self.predict(frames_tensor, return_raw)
         result["model_name"] = self.model_name
         
         return result
@@ -9,6 +9,7 @@ import os
 import sys
 import time
 import tempfile
+import threading
 from pathlib import Path
 from typing import Dict, Any, Optional, Union
 
@@ -16,21 +17,77 @@ import numpy as np
 import torch
 from PIL import Image
 
+from api.core.config import get_settings
+from api.services.result_cache import ResultCache, content_digest
+
+settings = get_settings()
+
 # Determine GenConViT path - works in both local and Docker environments
 # In Docker: /app/model/video/GenConViT
 # Local: relative to this file
 if os.path.exists("/app/model/video/GenConViT"):
     GENCONVIT_PATH = Path("/app/model/video/GenConViT")
-    IN_DOCKER = True
 else:
     GENCONVIT_PATH = Path(__file__).parent.parent.parent / "model" / "video" / "GenConViT"
-    IN_DOCKER = False
 
-# Store original sys.path to restore later
-_original_sys_path = sys.path.copy()
+_pred_func = None
+_import_lock = threading.Lock()
+
+
+def _load_pred_func():
+    """
+    Import GenConViT's prediction helpers once, as model.video.GenConViT.model.
+    
+    Importing through the package path leaves our own top-level `model`
+    package alone; GenConViT resolves its weights and config from its own
+    files, so no chdir is needed. Its directory is on sys.path only while
+    importing, for its top-level `dataset` package.
+    """
+    global _pred_func
+    with _import_lock:
+        if _pred_func is None:
+            # Bind our `model` package first, or GenConViT's own model/
+            # (a regular package) would win the lookup once its dir is on the path
+            import model.video.GenConViT.model
+            
+            sys.path.insert(0, str(GENCONVIT_PATH))
+            try:
+                from model.video.GenConViT.model import pred_func
+            finally:
+                sys.path.remove(str(GENCONVIT_PATH))
+            _pred_func = pred_func
+    return _pred_func
+
+
+# The upload is already in RAM, so its temp copy goes to tmpfs when there is one
+_SHM_DIR = "/dev/shm" if os.path.isdir("/dev/shm") else None
+
+
+def _write_temp(data: bytes, suffix: str) -> str:
+    """
+    Write bytes to a named temp file for the decoders, preferring /dev/shm.
+    
+    Falls back to the regular temp dir if tmpfs is missing or full
+    (Docker's default /dev/shm is only 64 MiB).
+    """
+    if _SHM_DIR is not None:
+        try:
+            return _write_temp_in(data, suffix, _SHM_DIR)
+        except OSError:
+            pass
+    return _write_temp_in(data, suffix, None)
+
 
-# Store original working directory
-_original_cwd = os.getcwd()
+def _write_temp_in(data: bytes, suffix: str, directory: Optional[str]) -> str:
+    """Write bytes to a new temp file in directory, removing it on failure."""
+    fd, path = tempfile.mkstemp(suffix=suffix, dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as tmp:
+            tmp.write(data)
+    except BaseException:
+        os.unlink(path)
+        raise
+    return path
 
 
 class GenConViTService:
@@ -66,6 +123,11 @@ class GenConViTService:
         self._is_loaded = False
         self._genconvit_path = GENCONVIT_PATH
         
+        # Results of recent uploads, keyed by content; detect_video_bytes()
+        # runs on worker threads, so the cache is guarded by a lock
+        self._results = ResultCache(max_entries=64, ttl_seconds=settings.RESULT_CACHE_TTL_SECONDS)
+        self._results_lock = threading.Lock()
+        
     @property
     def is_loaded(self) -> bool:
         return self._is_loaded
@@ -75,47 +137,28 @@ class GenConViTService:
         if self._is_loaded:
             return
             
-        # Change to GenConViT directory for proper weight loading
-        os.chdir(self._genconvit_path)
+        pred_func = _load_pred_func()
+        config = pred_func.load_config()
         
-        # Temporarily modify sys.path to prioritize GenConViT's model package
-        # This is critical in Docker where /app/model conflicts with GenConViT/model
-        original_path = sys.path.copy()
+        # Set weight names based on net type
+        ed_weight = "genconvit_ed_inference" if self.net in ["ed", "genconvit"] else None
+        vae_weight = "genconvit_vae_inference" if self.net in ["vae", "genconvit"] else None
         
-        # Remove /app from path to avoid conflict with mounted model directory
-        if IN_DOCKER:
-            sys.path = [p for p in sys.path if p != '/app' and not p.startswith('/app/model')]
+        self.model = pred_func.load_genconvit(config, self.net, ed_weight, vae_weight, self.fp16)
         
-        # Add GenConViT path at the very front
-        sys.path.insert(0, str(self._genconvit_path))
+        from api.services.genconvit_detector import use_sdpa_attention
+        use_sdpa_attention(self.model)
+        self._is_loaded = True
         
-        try:
-            # Clear any cached 'model' module to force reimport from GenConViT
-            modules_to_remove = [m for m in sys.modules if m == 'model' or m.startswith('model.')]
-            for m in modules_to_remove:
-                del sys.modules[m]
-            
-            from model.config import load_config
-            from model.pred_func import load_genconvit
-            
-            config = load_config()
-            
-            # Set weight names based on net type
-            ed_weight = "genconvit_ed_inference" if self.net in ["ed", "genconvit"] else None
-            vae_weight = "genconvit_vae_inference" if self.net in ["vae", "genconvit"] else None
-            
-            self.model = load_genconvit(config, self.net, ed_weight, vae_weight, self.fp16)
-            self._is_loaded = True
-            
-            print(f"✅ GenConViT ({self.net}) loaded on {self.device}")
-            
-        finally:
-            # Restore original sys.path
-            sys.path = original_path
-            os.chdir(_original_cwd)
+        print(f"✅ GenConViT ({self.net}) loaded on {self.device}")
     
     def unload_model(self) -> None:
-        """Unload model to free memory."""
+        """
+        Unload model to free memory.
+        
+        Calls already inside detect_video() keep their own reference and
+        finish normally; the weights go once they return.
+        """
         if self.model is not None:
             del self.model
             self.model = None
@@ -139,71 +182,59 @@ class GenConViTService:
         """
         if not self._is_loaded:
             self.load_model()
+        # Held for the whole call, so a concurrent unload_model() can't pull it away
+        model = self.model
         
         num_frames = num_frames or self.num_frames
         video_path = str(video_path)
         
-        # Change to GenConViT directory for imports
-        os.chdir(self._genconvit_path)
+        from api.utils.video import VideoProcessor
         
-        # Temporarily modify sys.path for GenConViT imports
-        original_path = sys.path.copy()
-        if IN_DOCKER:
-            sys.path = [p for p in sys.path if p != '/app' and not p.startswith('/app/model')]
-        sys.path.insert(0, str(self._genconvit_path))
+        pred_func = _load_pred_func()
+        start_time = time.time()
         
-        try:
-            from model.pred_func import (
-                df_face, 
-                pred_vid, 
-                real_or_fake,
-                extract_frames,
-                face_rec,
-                preprocess_frame
-            )
-            
-            start_time = time.time()
-            
-            # Extract faces from video frames
-            df = df_face(video_path, num_frames)
-            
-            if len(df) < 1:
-                return {
-                    "is_fake": False,
-                    "confidence": 0.0,
-                    "prediction": "UNKNOWN",
-                    "error": "No faces detected in video",
-                    "frames_analyzed": 0,
-                    "processing_time_ms": (time.time() - start_time) * 1000
-                }
-            
-            if self.fp16:
-                df = df.half()
-            
-            # Run prediction
-            y, y_val = pred_vid(df, self.model)
-            prediction = real_or_fake(y)
-            
-            processing_time = (time.time() - start_time) * 1000
-            
-            # y=0 means FAKE (inverted), y=1 means REAL
-            # y_val is the confidence (closer to 0 = more fake, closer to 1 = more real)
-            is_fake = prediction == "FAKE"
-            confidence = (1 - y_val) if is_fake else y_val
-            
+        # Extract faces from video frames: keyframe seeking when the
+        # stream allows it, otherwise GenConViT's linear decord sampling
+        frames = VideoProcessor().extract_keyframes(video_path, num_frames)
+        if frames is None:
+            df = pred_func.df_face(video_path, num_frames)
+        else:
+            faces, count = pred_func.face_rec(frames)
+            df = pred_func.preprocess_frame(faces) if count > 0 else []
+        
+        if len(df) < 1:
             return {
-                "is_fake": is_fake,
-                "confidence": round(confidence * 100, 2),
-                "prediction": prediction,
-                "raw_score": y_val,
-                "frames_analyzed": len(df),
-                "processing_time_ms": round(processing_time, 2),
-                "model": f"genconvit_{self.net}"
+                "is_fake": False,
+                "confidence": 0.0,
+                "prediction": "UNKNOWN",
+                "error": "No faces detected in video",
+                "frames_analyzed": 0,
+                "processing_time_ms": (time.time() - start_time) * 1000
             }
-            
-        finally:
-            sys.path = original_path
-            os.chdir(_original_cwd)
+        
+        if self.fp16:
+            df = df.half()
+        
+        # Run prediction
+        y, y_val = pred_func.pred_vid(df, model)
+        prediction = pred_func.real_or_fake(y)
+        
+        processing_time = (time.time() - start_time) * 1000
+        
+        # y=0 means FAKE (inverted), y=1 means REAL
+        # y_val is the confidence (closer to 0 = more fake, closer to 1 = more real)
+        is_fake = prediction == "FAKE"
+        confidence = (1 - y_val) if is_fake else y_val
+        
+        return {
+            "is_fake": is_fake,
+            "confidence": round(confidence * 100, 2),
+            "prediction": prediction,
+            "raw_score": y_val,
+            "frames_analyzed": len(df),
+            "processing_time_ms": round(processing_time, 2),
+            "model": f"genconvit_{self.net}"
+        }
     
     def detect_video_bytes(
         self,
@@ -214,6 +245,8 @@ class GenConViTService:
         """
         Detect deepfake from video bytes (for API uploads).
         
+        Duplicate uploads are answered from a per-service result cache.
+        
         Args:
             video_bytes: Raw video file bytes
             filename: Original filename for extension detection
@@ -222,34 +255,55 @@ class GenConViTService:
         Returns:
             Detection result
         """
+        key = (num_frames or self.num_frames, content_digest(video_bytes))
+        with self._results_lock:
+            cached = self._results.get(key)
+        if cached is not None:
+            return cached
+        
         # Save to temporary file
         suffix = Path(filename).suffix or ".mp4"
-        
-        with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as tmp:
-            tmp.write(video_bytes)
-            tmp_path = tmp.name
+        tmp_path = _write_temp(video_bytes, suffix)
         
         try:
-            return self.detect_video(tmp_path, num_frames)
+            result = self.detect_video(tmp_path, num_frames)
         finally:
             # Clean up temp file
             if os.path.exists(tmp_path):
                 os.unlink(tmp_path)
-
-
-# Singleton instance
-_genconvit_service: Optional[GenConViTService] = None
+        
+        with self._results_lock:
+            self._results.put(key, result)
+        return result
 
 
 def get_genconvit_service(
     net: str = "ed",
-    num_frames: int = 15,
     fp16: bool = False
 ) -> GenConViTService:
-    """Get or create singleton GenConViT service instance."""
-    global _genconvit_service
+    """
+    Get or create the GenConViT service for a model variant.
+    
+    Services are cached by variant only; pass num_frames per call to
+    detect_video()/detect_video_bytes() instead.
+    """
+    from api.services.model_cache import model_cache
+    
+    def _load() -> GenConViTService:
+        service = GenConViTService(net=net, fp16=fp16)
+        service.load_model()
+        return service
     
-    if _genconvit_service is None:
-        _genconvit_service = GenConViTService(net=net, num_frames=num_frames, fp16=fp16)
+    # Checkpoint size approximates the weights' device footprint
+    weights = ["genconvit_ed_inference"] if net in ["ed", "genconvit"] else []
+    weights += ["genconvit_vae_inference"] if net in ["vae", "genconvit"] else []
+    size_estimate = sum(
+        path.stat().st_size
+        for path in (GENCONVIT_PATH / "weight" / f"{weight}.pth" for weight in weights)
+        if path.exists()
+    )
+    if fp16:
+        size_estimate //= 2
     
-    return _genconvit_service
+    name = f"genconvit_{net}_fp16" if fp16 else f"genconvit_{net}"
+    return model_cache.get(name, _load, size_estimate)
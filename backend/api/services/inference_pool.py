@@ -0,0 +1,253 @@
+"""
+Inference Pool - Executors that keep blocking model calls off the event loop.
+
+Model calls run on a dedicated, bounded thread pool (run_in_thread) rather
+than the default executor, so inference can't starve other blocking work
+and concurrency is sized for the hardware.
+
+Threads only overlap the parts of a forward pass that release the GIL,
+so under load the detectors in one server process contend for it. When
+INFERENCE_PROCESSES is set, image detection is dispatched to a pool of
+spawned processes instead, each pinned to its own slice of CPU cores
+and holding its own copy of the detectors.
+"""
+import asyncio
+import functools
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Set, TypeVar
+
+from api.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+T = TypeVar("T")
+
+_pool: Optional[ProcessPoolExecutor] = None
+_threads: Optional[ThreadPoolExecutor] = None
+_heatmap_threads: Optional[ThreadPoolExecutor] = None
+
+
+def inference_threads() -> int:
+    """
+    Size of the inference thread pool.
+
+    INFERENCE_THREADS=0 sizes it automatically: on GPU, enough threads
+    for every inference slot and CUDA stream to have a batch in flight
+    (and at least one per GPU), otherwise half the cores, leaving the
+    rest to torch's intra-op threads.
+    """
+    workers = settings.INFERENCE_THREADS
+    if workers <= 0:
+        import torch
+        if torch.cuda.is_available():
+            workers = max(
+                torch.cuda.device_count(),
+                settings.INFERENCE_SLOTS,
+                settings.CUDA_STREAMS,
+            )
+        else:
+            workers = max(1, len(_available_cores()) // 2)
+    return workers
+
+
+def compile_mode(device_type: str) -> str:
+    """
+    torch.compile mode for a model whose forwards run on the inference pool.
+
+    reduce-overhead's CUDA graphs are recorded per thread and don't
+    support concurrent replays from several streams, so they are only
+    used when a single inference thread runs every forward.
+
+    Args:
+        device_type: "cuda" or "cpu"
+
+    Returns:
+        Mode name for torch.compile
+    """
+    if device_type != "cuda":
+        return "default"
+    return "reduce-overhead" if inference_threads() == 1 else "max-autotune-no-cudagraphs"
+
+
+def _thread_pool() -> ThreadPoolExecutor:
+    """Create the inference thread pool on first use (see inference_threads)."""
+    global _threads
+    if _threads is None:
+        _threads = ThreadPoolExecutor(max_workers=inference_threads(), thread_name_prefix="inference")
+    return _threads
+
+
+async def run_in_thread(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Run a blocking model call on the inference thread pool.
+
+    Args:
+        fn: Blocking callable (forward pass, detector.predict, ...)
+        *args: Positional arguments for fn
+        **kwargs: Keyword arguments for fn
+
+    Returns:
+        fn's return value
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_thread_pool(), functools.partial(fn, *args, **kwargs))
+
+
+def _heatmap_pool() -> ThreadPoolExecutor:
+    """Create the small heatmap side pool on first use."""
+    global _heatmap_threads
+    if _heatmap_threads is None:
+        _heatmap_threads = ThreadPoolExecutor(
+            max_workers=max(1, settings.HEATMAP_THREADS),
+            thread_name_prefix="heatmap",
+        )
+    return _heatmap_threads
+
+
+async def run_heatmap(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Run a heatmap (backward pass + encode) on its own small thread pool.
+
+    Kept apart from the inference pool so opt-in heatmaps overlap with
+    other requests' forward passes instead of taking their threads.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_heatmap_pool(), functools.partial(fn, *args, **kwargs))
+
+
+def _available_cores() -> List[int]:
+    """CPU cores this process may run on."""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def _partition_cores(workers: int) -> List[Set[int]]:
+    """Split the available cores into one disjoint set per worker."""
+    cores = _available_cores()
+    workers = max(1, min(workers, len(cores)))
+    return [set(cores[i::workers]) for i in range(workers)]
+
+
+def _init_worker(core_sets: List[Set[int]], counter: Any) -> None:
+    """
+    Pin the worker to its cores and load the detectors once.
+
+    Args:
+        core_sets: Core partition per worker
+        counter: Shared counter used to hand out partitions
+    """
+    import torch
+
+    with counter.get_lock():
+        index = counter.value
+        counter.value += 1
+    cores = core_sets[index % len(core_sets)]
+
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cores)
+    torch.set_num_threads(len(cores))
+
+    from api.services.model_manager import initialize_models
+    initialize_models()
+
+    logger.info(f"Inference worker {os.getpid()} pinned to cores {sorted(cores)}")
+
+
+def _detect_image(
+    image_bytes: bytes,
+    content_type: Optional[str],
+    include_heatmap: bool,
+) -> Dict[str, Any]:
+    """Run the image ensemble inside a worker process."""
+    from api.services.model_manager import model_manager
+    return model_manager.detect_image_sync(image_bytes, content_type, include_heatmap)
+
+
+def resolve_workers(configured: int, server_workers: int) -> int:
+    """
+    Resolve the configured pool size.
+
+    Args:
+        configured: INFERENCE_PROCESSES (0 disables, -1 sizes automatically)
+        server_workers: Number of server processes sharing this machine
+
+    Returns:
+        Number of pool workers (0 when disabled)
+    """
+    if configured >= 0:
+        return configured
+    return max(1, len(_available_cores()) // max(1, server_workers))
+
+
+def start_pool(workers: int) -> None:
+    """
+    Start the process pool.
+
+    Workers are spawned rather than forked so they don't inherit the
+    parent's torch thread pools or event loop.
+
+    Args:
+        workers: Number of worker processes
+    """
+    global _pool
+    if _pool is not None or workers <= 0:
+        return
+
+    ctx = multiprocessing.get_context("spawn")
+    core_sets = _partition_cores(workers)
+    _pool = ProcessPoolExecutor(
+        max_workers=len(core_sets),
+        mp_context=ctx,
+        initializer=_init_worker,
+        initargs=(core_sets, ctx.Value("i", 0)),
+    )
+    logger.info(f"Inference pool started with {len(core_sets)} workers")
+
+
+def shutdown_pool() -> None:
+    """Stop the process and thread pools, if running."""
+    global _pool, _threads, _heatmap_threads
+    if _pool is not None:
+        _pool.shutdown(wait=True, cancel_futures=True)
+        _pool = None
+    if _threads is not None:
+        _threads.shutdown(wait=True, cancel_futures=True)
+        _threads = None
+    if _heatmap_threads is not None:
+        _heatmap_threads.shutdown(wait=True, cancel_futures=True)
+        _heatmap_threads = None
+
+
+def is_enabled() -> bool:
+    """Whether image detection is dispatched to the pool."""
+    return _pool is not None
+
+
+async def detect_image(
+    image_bytes: bytes,
+    content_type: Optional[str] = None,
+    include_heatmap: bool = False,
+) -> Dict[str, Any]:
+    """
+    Run image ensemble detection in a pool worker.
+
+    Only the compressed upload crosses the process boundary; decoding
+    and preprocessing happen in the worker.
+
+    Args:
+        image_bytes: Raw image bytes
+        content_type: Upload MIME type (enables the fast JPEG path)
+        include_heatmap: Also generate a heatmap
+
+    Returns:
+        Ensemble detection result
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _pool, _detect_image, image_bytes, content_type, include_heatmap
+    )
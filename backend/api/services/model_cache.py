@@ -0,0 +1,180 @@
+"""
+Model Cache - LRU cache for on-demand models (image variants, GenConViT nets).
+
+Models are cached by name only, so per-request options never trigger a
+reload. When a new model would not fit, the least recently used ones
+are evicted: on GPU based on torch.cuda.mem_get_info(), and everywhere
+once MODEL_CACHE_SIZE models are resident.
+"""
+import gc
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+import torch
+
+from api.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+class ModelCache:
+    """
+    Singleton LRU cache of loaded models.
+    """
+
+    _instance: Optional["ModelCache"] = None
+
+    def __new__(cls) -> "ModelCache":
+        """Ensure only one instance exists (singleton pattern)."""
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self, max_entries: Optional[int] = None):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries: Maximum resident models (defaults to MODEL_CACHE_SIZE)
+        """
+        if self._initialized:
+            return
+
+        self._models: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        # One lock per model being built, so concurrent misses on the same
+        # name load it once while other names stay available
+        self._loading: Dict[str, threading.Lock] = {}
+        self.max_entries = max_entries or settings.MODEL_CACHE_SIZE
+        self._initialized = True
+
+    def get(
+        self,
+        name: str,
+        factory: Callable[[], Any],
+        size_estimate: int = 0,
+    ) -> Any:
+        """
+        Return the cached model, creating it with factory() on a miss.
+
+        Blocking (factory loads weights): call it off the event loop. The
+        cache lock is not held while factory() runs.
+
+        Args:
+            name: Cache key (model name, without per-request options)
+            factory: Builds and loads the model
+            size_estimate: Bytes of GPU memory the model needs (0 for CPU models)
+
+        Returns:
+            The cached model
+        """
+        with self._lock:
+            model = self._lookup(name)
+            if model is not None:
+                return model
+            loading = self._loading.setdefault(name, threading.Lock())
+
+        with loading:
+            try:
+                with self._lock:
+                    # Another caller may have built it while we waited
+                    model = self._lookup(name)
+                    if model is not None:
+                        return model
+                    evicted = self._evict_until(lambda: len(self._models) >= self.max_entries)
+                if evicted:
+                    self._release(evicted)
+
+                if size_estimate and torch.cuda.is_available():
+                    self._make_room(size_estimate)
+
+                model = factory()
+                with self._lock:
+                    self._models[name] = model
+                    logger.info(f"Model cache: loaded {name} ({len(self._models)} resident)")
+                    # Other names may have loaded meanwhile
+                    evicted = self._evict_until(lambda: len(self._models) > self.max_entries)
+                if evicted:
+                    self._release(evicted)
+                return model
+            finally:
+                with self._lock:
+                    if self._loading.get(name) is loading:
+                        del self._loading[name]
+
+    def evict(self, name: str) -> None:
+        """Drop a model from the cache."""
+        with self._lock:
+            evicted = [self._models.pop(name)] if name in self._models else []
+        if evicted:
+            self._release(evicted)
+    
+    def clear(self) -> List[str]:
+        """
+        Drop every cached model.
+        
+        Returns:
+            Names of the models that were resident
+        """
+        with self._lock:
+            names = list(self._models.keys())
+            evicted = self._evict_until(lambda: bool(self._models))
+        if evicted:
+            self._release(evicted)
+        return names
+
+    def list_models(self) -> List[str]:
+        """Cached model names, least recently used first."""
+        return list(self._models.keys())
+
+    def _lookup(self, name: str) -> Any:
+        """Return a cached model and mark it recently used (caller holds the lock)."""
+        model = self._models.get(name)
+        if model is not None:
+            self._models.move_to_end(name)
+        return model
+
+    def _make_room(self, size_estimate: int) -> None:
+        """Evict LRU models one at a time until the GPU has size_estimate bytes free."""
+        while torch.cuda.mem_get_info()[0] < size_estimate:
+            with self._lock:
+                evicted = self._evict_until(lambda: bool(self._models), limit=1)
+            if not evicted:
+                break
+            self._release(evicted)
+
+    def _evict_until(self, condition: Callable[[], bool], limit: Optional[int] = None) -> List[Any]:
+        """
+        Pop LRU models while condition() holds (caller holds the lock).
+
+        Returns:
+            The evicted models, to be released once the lock is dropped
+        """
+        evicted = []
+        while self._models and condition() and (limit is None or len(evicted) < limit):
+            name, model = self._models.popitem(last=False)
+            evicted.append(model)
+            logger.info(f"Model cache: evicted {name}")
+        return evicted
+    
+    @staticmethod
+    def _release(models: List[Any]) -> None:
+        """
+        Drop evicted models and return their memory (outside the lock).
+
+        Only the cache's reference goes: a batcher or in-flight request
+        still holding a model keeps it working, and its weights are freed
+        once the last holder lets go.
+        """
+        del models[:]
+        gc.collect()
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+
+
+# Global instance
+model_cache = ModelCache()
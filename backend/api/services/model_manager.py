@@ -4,14 +4,66 @@ Model Manager - Singleton manager for all detection models.
 Handles model lifecycle, loading/unloading, and provides
 a unified interface for the detection routes to access models.
 """
-from typing import Dict, Optional, List, Any
+from typing import Dict, Optional, List, Any, Tuple, Union
+from itertools import islice
 from pathlib import Path
+import asyncio
 import logging
+import os
+import threading
+
+import torch
 
 from api.services.base import BaseDetector
-from api.core.config import settings
+from api.services.batching import MicroBatcher
+from api.services.inference_pool import run_heatmap, run_in_thread
+from api.services.temporal import TemporalAnalyzer
+from api.utils.video import VideoProcessor
+from api.core.config import get_settings
 
 logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Bounds concurrent forward passes so parallel detectors don't contend for VRAM/cores
+_inference_slots = asyncio.Semaphore(settings.INFERENCE_SLOTS)
+
+# Decoded video frames held at once while preprocessing
+_FRAME_CHUNK = 8
+
+# Leading video frames scored individually for temporal analysis
+_PER_FRAME_LIMIT = 10
+
+# Per-device pools of CUDA streams so concurrent GPU batches don't serialize
+# on the default stream
+_cuda_streams: Dict[torch.device, asyncio.Queue] = {}
+
+
+def _get_cuda_streams(device: Union[str, torch.device]) -> Optional[asyncio.Queue]:
+    """
+    Get the stream pool for a device, creating it on first use.
+    
+    Streams belong to one device, so each GPU gets its own pool; a
+    detector on cuda:1 must not run under a cuda:0 stream.
+    
+    Args:
+        device: Detector device
+        
+    Returns:
+        Queue of streams on that device, or None for CPU devices
+    """
+    device = torch.device(device)
+    if device.type != "cuda" or settings.CUDA_STREAMS <= 0 or not torch.cuda.is_available():
+        return None
+    if device.index is None:
+        device = torch.device("cuda", torch.cuda.current_device())
+    
+    streams = _cuda_streams.get(device)
+    if streams is None:
+        streams = asyncio.Queue()
+        for _ in range(settings.CUDA_STREAMS):
+            streams.put_nowait(torch.cuda.Stream(device=device))
+        _cuda_streams[device] = streams
+    return streams
 
 
 class ModelManager:
@@ -23,12 +75,17 @@ class ModelManager:
     """
     
     _instance: Optional["ModelManager"] = None
+    _instance_lock = threading.Lock()
     
     def __new__(cls) -> "ModelManager":
         """Ensure only one instance exists (singleton pattern)."""
+        # Double-checked: the lock is only taken until the instance exists
         if cls._instance is None:
-            cls._instance = super().__new__(cls)
-            cls._instance._initialized = False
+            with cls._instance_lock:
+                if cls._instance is None:
+                    instance = super().__new__(cls)
+                    instance._initialized = False
+                    cls._instance = instance
         return cls._instance
     
     def __init__(self):
@@ -36,7 +93,19 @@ class ModelManager:
         if self._initialized:
             return
         
+        with self._instance_lock:
+            if not self._initialized:
+                self._init_state()
+    
+    def _init_state(self) -> None:
+        """Set up instance state (once, under the instance lock)."""
         self._detectors: Dict[str, BaseDetector] = {}
+        self._batchers: Dict[str, MicroBatcher] = {}
+        self._genconvit: Optional[BaseDetector] = None
+        self._genconvit_lock = asyncio.Lock()
+        # Stateless per request (sample rate is passed per call), so shared
+        self._video_processor = VideoProcessor()
+        self._temporal_analyzer = TemporalAnalyzer()
         self._model_path = Path(settings.MODEL_PATH)
         self._default_device = "cpu"  # Start with CPU, switch to GPU if available
         self._initialized = True
@@ -54,6 +123,7 @@ class ModelManager:
             logger.warning(f"Detector '{detector.model_name}' already registered, replacing")
         
         self._detectors[detector.model_name] = detector
+        self._batchers.pop(detector.model_name, None)
         logger.info(f"Registered detector: {detector.model_name}")
     
     def get_detector(self, name: str) -> Optional[BaseDetector]:
@@ -68,26 +138,110 @@ class ModelManager:
         """
         return self._detectors.get(name)
     
+    def _get_batcher(self, detector: BaseDetector, clips: bool = False) -> MicroBatcher:
+        """Get or create the micro-batcher for a detector (clips: video detectors)."""
+        batcher = self._batchers.get(detector.model_name)
+        if batcher is None:
+            batcher = MicroBatcher(
+                detector,
+                max_batch_size=settings.VIDEO_BATCH_MAX_SIZE if clips else settings.BATCH_MAX_SIZE,
+                timeout_ms=settings.BATCH_TIMEOUT_MS,
+                slots=_inference_slots,
+                streams=_get_cuda_streams(detector.device),
+                clips=clips,
+            )
+            self._batchers[detector.model_name] = batcher
+        return batcher
+    
+    def place_detectors(self) -> Dict[str, str]:
+        """
+        Assign unloaded detectors to devices by worst-fit decreasing.
+        
+        Detectors are taken largest memory_estimate first and each goes
+        to the GPU with the most free memory (within GPU_MEM_FRACTION),
+        which keeps the GPUs evenly loaded; anything that fits nowhere,
+        or has no estimate, stays on CPU. Call before load_all().
+        
+        Queries free memory through CUDA, so call it per worker after
+        the fork, never from a preloading gunicorn master. Every worker
+        places its own copy of the models at about the same moment and
+        sees the same free memory, so estimates are per process and each
+        GPU's budget is split WEB_CONCURRENCY ways; ties between equally
+        free GPUs are broken by PID so workers start on different GPUs.
+        
+        Returns:
+            Dict mapping detector names to their assigned device
+        """
+        free = {}
+        if torch.cuda.is_available():
+            workers = max(1, settings.WEB_CONCURRENCY)
+            count = torch.cuda.device_count()
+            # Rotated device order: max() keeps the first of equal budgets
+            for offset in range(count):
+                index = (os.getpid() + offset) % count
+                free_bytes, total_bytes = torch.cuda.mem_get_info(index)
+                reserve = total_bytes * (1.0 - min(settings.GPU_MEM_FRACTION, 1.0))
+                free[f"cuda:{index}"] = (free_bytes - reserve) / workers
+        
+        placement = {}
+        pending = sorted(
+            (d for d in self._detectors.values() if not d.is_loaded),
+            key=lambda d: d.memory_estimate,
+            reverse=True,
+        )
+        for detector in pending:
+            device = "cpu"
+            if detector.memory_estimate > 0 and free:
+                roomiest = max(free, key=free.get)
+                if free[roomiest] >= detector.memory_estimate:
+                    device = roomiest
+                    free[roomiest] -= detector.memory_estimate
+            
+            detector.device = device
+            placement[detector.model_name] = device
+            logger.info(f"Placed detector {detector.model_name} on {device}")
+        
+        return placement
+    
     def list_detectors(self) -> List[str]:
         """Get list of all registered detector names."""
         return list(self._detectors.keys())
     
     def load_all(self) -> Dict[str, bool]:
         """
-        Load all registered detectors.
+        Load all registered detectors concurrently.
+        
+        Checkpoint reads and host->device copies release the GIL, so
+        loads overlap and cold start takes roughly the slowest load
+        rather than the sum.
         
         Returns:
             Dict mapping detector names to load success status
         """
+        from concurrent.futures import ThreadPoolExecutor
+        
+        if not self._detectors:
+            return {}
+        
+        # No eager torch.cuda.init(): under PRELOAD_MODELS this runs in the
+        # gunicorn master, and a CUDA context there breaks every forked worker
         results = {}
-        for name, detector in self._detectors.items():
-            try:
-                detector.load_model()
-                results[name] = True
-                logger.info(f"Loaded detector: {name}")
-            except Exception as e:
-                logger.error(f"Failed to load detector {name}: {e}")
-                results[name] = False
+        with ThreadPoolExecutor(
+            max_workers=min(8, len(self._detectors)),
+            thread_name_prefix="model-load",
+        ) as executor:
+            futures = {
+                name: executor.submit(detector.load_model)
+                for name, detector in self._detectors.items()
+            }
+            for name, future in futures.items():
+                try:
+                    future.result()
+                    results[name] = True
+                    logger.info(f"Loaded detector: {name}")
+                except Exception as e:
+                    logger.error(f"Failed to load detector {name}: {e}")
+                    results[name] = False
         return results
     
     def unload_all(self) -> None:
@@ -112,18 +266,53 @@ class ModelManager:
             if not status["is_loaded"]:
                 all_loaded = False
         
-        return {
+        health = {
             "models_registered": len(self._detectors),
             "all_models_loaded": all_loaded and len(self._detectors) > 0,
             "model_path": str(self._model_path),
             "default_device": self._default_device,
             "detectors": detector_status,
         }
+        return health
+    
+    async def _run_detector(
+        self,
+        name: str,
+        detector: BaseDetector,
+        image: Any,
+        include_heatmap: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        Run a single detector through its micro-batcher.
+        
+        Preprocessing happens in a worker thread; the forward pass is
+        coalesced with other in-flight requests for the same detector.
+        A requested heatmap runs afterwards on the heatmap side pool.
+        Errors are returned as {"error": ...} so one failing detector
+        doesn't cancel the rest of the ensemble.
+        """
+        try:
+            await detector.ensure_loaded()
+            
+            tensor = await asyncio.to_thread(detector.preprocess, image)
+            result = await self._get_batcher(detector).submit(tensor)
+            
+            if include_heatmap and detector.supports_heatmap:
+                result["heatmap_base64"] = await run_heatmap(detector.heatmap, tensor, result)
+            
+            result["model_name"] = detector.model_name
+            result["threshold_used"] = detector.confidence_threshold
+            return result
+        except Exception as e:
+            logger.error(f"Detector {name} failed: {e}")
+            return {"error": str(e)}
     
     async def detect_image(
         self,
         image_bytes: bytes,
         use_ensemble: bool = True,
+        content_type: Optional[str] = None,
+        include_heatmap: bool = False,
     ) -> Dict[str, Any]:
         """
         Run detection on an image using ensemble of detectors.
@@ -133,104 +322,173 @@ class ModelManager:
         - Only one says FAKE with high confidence (>0.8) → FAKE
         - Only one says FAKE with low confidence → UNCERTAIN
         - Both agree REAL → REAL
+        
+        Heatmaps cost an extra backward pass and are only generated
+        when include_heatmap is set.
         """
-        from io import BytesIO
-        from PIL import Image
+        from api.services import inference_pool
+        from api.utils.preprocessing import decode_image
         
-        HIGH_CONFIDENCE_THRESHOLD = 0.8
+        if inference_pool.is_enabled():
+            return await inference_pool.detect_image(image_bytes, content_type, include_heatmap)
         
         if not self._detectors:
-            return {
-                "is_fake": False,
-                "confidence": 0.0,
-                "model_scores": {},
-                "error": "No detectors registered"
-            }
+            return self._no_detectors_result()
         
         try:
-            # Convert bytes to PIL Image
-            image = Image.open(BytesIO(image_bytes)).convert("RGB")
+            # Convert bytes to PIL Image (decode off the event loop)
+            image = await asyncio.to_thread(decode_image, image_bytes, content_type)
             
-            # Collect results from all detectors
-            model_scores = {}
-            all_predictions = []
-            heatmap_base64 = None
+            # Run all detectors concurrently, each in its own worker thread
+            async with asyncio.TaskGroup() as tg:
+                tasks = {
+                    name: tg.create_task(
+                        self._run_detector(name, detector, image, include_heatmap)
+                    )
+                    for name, detector in self._detectors.items()
+                }
             
+            return self._aggregate_ensemble(
+                {name: task.result() for name, task in tasks.items()}
+            )
+            
+        except Exception as e:
+            logger.error(f"Image detection failed: {e}")
+            return self._failed_result(e)
+    
+    def detect_image_sync(
+        self,
+        image_bytes: bytes,
+        content_type: Optional[str] = None,
+        include_heatmap: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        Blocking variant of detect_image, used inside inference pool workers.
+        
+        Detectors run one after another; the pool provides the parallelism.
+        """
+        from api.utils.preprocessing import decode_image
+        
+        if not self._detectors:
+            return self._no_detectors_result()
+        
+        try:
+            image = decode_image(image_bytes, content_type)
+            
+            results = {}
             for name, detector in self._detectors.items():
                 try:
-                    result = detector.detect(image)
-                    fake_prob = result.get("fake_probability", 0.0)
-                    model_scores[name] = {
-                        "fake_probability": fake_prob,
-                        "is_fake": result.get("is_fake", False)
-                    }
-                    all_predictions.append({
-                        "name": name,
-                        "is_fake": result.get("is_fake", False),
-                        "fake_probability": fake_prob
-                    })
-                    # Get heatmap from first available
-                    if heatmap_base64 is None and result.get("heatmap_base64"):
-                        heatmap_base64 = result["heatmap_base64"]
+                    results[name] = detector.detect(image, include_heatmap)
                 except Exception as e:
                     logger.error(f"Detector {name} failed: {e}")
-                    model_scores[name] = {"error": str(e)}
-            
-            if not all_predictions:
-                return {"is_fake": False, "confidence": 0.0, "error": "All detectors failed"}
-            
-            fake_votes = sum(1 for p in all_predictions if p["is_fake"])
-            total_votes = len(all_predictions)
-            max_fake_prob = max(p["fake_probability"] for p in all_predictions)
-            avg_fake_prob = sum(p["fake_probability"] for p in all_predictions) / total_votes
+                    results[name] = {"error": str(e)}
             
-            # Ensemble decision
-            if fake_votes == total_votes:
-                # All detectors agree it's fake
-                is_fake = True
-                status = "fake"
-                confidence = avg_fake_prob
-            elif fake_votes == 0:
-                # All detectors agree it's real
-                is_fake = False
-                status = "real"
-                confidence = 1.0 - avg_fake_prob
-            else:
-                # Disagrement - check if any has high confidence
-                if max_fake_prob >= HIGH_CONFIDENCE_THRESHOLD:
-                    is_fake = True
-                    status = "likely_fake"
-                    confidence = max_fake_prob
-                else:
-                    # Low confidence disagreement - mark as uncertain
-                    is_fake = False
-                    status = "uncertain"
-                    confidence = avg_fake_prob
-            
-            return {
-                "is_fake": is_fake,
-                "status": status,  # "fake", "real", "likely_fake", "uncertain"
-                "confidence": confidence,
-                "model_scores": model_scores,
-                "detailed_predictions": all_predictions,
-                "ensemble_info": {
-                    "fake_votes": fake_votes,
-                    "total_votes": total_votes,
-                    "avg_fake_probability": avg_fake_prob,
-                    "max_fake_probability": max_fake_prob,
-                    "high_confidence_threshold": HIGH_CONFIDENCE_THRESHOLD
-                },
-                "heatmap_base64": heatmap_base64
-            }
+            return self._aggregate_ensemble(results)
             
         except Exception as e:
             logger.error(f"Image detection failed: {e}")
-            return {
-                "is_fake": False,
-                "confidence": 0.0,
-                "model_scores": {},
-                "error": str(e)
+            return self._failed_result(e)
+    
+    @staticmethod
+    def _no_detectors_result() -> Dict[str, Any]:
+        return {
+            "is_fake": False,
+            "confidence": 0.0,
+            "model_scores": {},
+            "error": "No detectors registered"
+        }
+    
+    @staticmethod
+    def _failed_result(error: Exception) -> Dict[str, Any]:
+        return {
+            "is_fake": False,
+            "confidence": 0.0,
+            "model_scores": {},
+            "error": str(error)
+        }
+    
+    def _aggregate_ensemble(self, results: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Combine per-detector results into the ensemble verdict.
+        
+        Args:
+            results: Detector name -> result dict (or {"error": ...})
+            
+        Returns:
+            Ensemble detection result
+        """
+        HIGH_CONFIDENCE_THRESHOLD = 0.8
+        
+        # Collect results from all detectors
+        model_scores = {}
+        all_predictions = []
+        heatmap_base64 = None
+        
+        for name, result in results.items():
+            if "error" in result:
+                model_scores[name] = {"error": result["error"]}
+                continue
+            
+            fake_prob = result.get("fake_probability", 0.0)
+            model_scores[name] = {
+                "fake_probability": fake_prob,
+                "is_fake": result.get("is_fake", False)
             }
+            all_predictions.append({
+                "name": name,
+                "is_fake": result.get("is_fake", False),
+                "fake_probability": fake_prob
+            })
+            # Get heatmap from first available
+            if heatmap_base64 is None and result.get("heatmap_base64"):
+                heatmap_base64 = result["heatmap_base64"]
+        
+        if not all_predictions:
+            return {"is_fake": False, "confidence": 0.0, "error": "All detectors failed"}
+        
+        fake_votes = sum(1 for p in all_predictions if p["is_fake"])
+        total_votes = len(all_predictions)
+        max_fake_prob = max(p["fake_probability"] for p in all_predictions)
+        avg_fake_prob = sum(p["fake_probability"] for p in all_predictions) / total_votes
+        
+        # Ensemble decision
+        if fake_votes == total_votes:
+            # All detectors agree it's fake
+            is_fake = True
+            status = "fake"
+            confidence = avg_fake_prob
+        elif fake_votes == 0:
+            # All detectors agree it's real
+            is_fake = False
+            status = "real"
+            confidence = 1.0 - avg_fake_prob
+        else:
+            # Disagrement - check if any has high confidence
+            if max_fake_prob >= HIGH_CONFIDENCE_THRESHOLD:
+                is_fake = True
+                status = "likely_fake"
+                confidence = max_fake_prob
+            else:
+                # Low confidence disagreement - mark as uncertain
+                is_fake = False
+                status = "uncertain"
+                confidence = avg_fake_prob
+        
+        return {
+            "is_fake": is_fake,
+            "status": status,  # "fake", "real", "likely_fake", "uncertain"
+            "confidence": confidence,
+            "model_scores": model_scores,
+            "detailed_predictions": all_predictions,
+            "ensemble_info": {
+                "fake_votes": fake_votes,
+                "total_votes": total_votes,
+                "avg_fake_probability": avg_fake_prob,
+                "max_fake_probability": max_fake_prob,
+                "high_confidence_threshold": HIGH_CONFIDENCE_THRESHOLD
+            },
+            "heatmap_base64": heatmap_base64
+        }
     
     async def detect_video(
         self,
@@ -238,7 +496,10 @@ class ModelManager:
         sample_rate: int = 10,
     ) -> Dict[str, Any]:
         """
-        Run detection on a video using GenConViT and temporal analysis.
+        Run detection on an in-memory video.
+        
+        Prefer detect_video_path() for uploads: the bytes are written to a
+        temp file before decoding anyway.
         
         Args:
             video_bytes: Raw video bytes
@@ -247,24 +508,106 @@ class ModelManager:
         Returns:
             Aggregated detection results with frame analysis
         """
-        from api.utils.video import VideoProcessor
-        from api.services.genconvit_detector import GenConViTDetector
-        from api.services.temporal import TemporalAnalyzer
+        return await self._detect_video(video_bytes, sample_rate)
+    
+    async def detect_video_path(
+        self,
+        video_path: str,
+        sample_rate: int = 10,
+    ) -> Dict[str, Any]:
+        """
+        Run detection on a video file, decoded straight from disk.
+        
+        Args:
+            video_path: Path to the video file
+            sample_rate: Analyze every Nth frame
+            
+        Returns:
+            Aggregated detection results with frame analysis
+        """
+        return await self._detect_video(video_path, sample_rate)
+    
+    async def _get_genconvit(self) -> BaseDetector:
+        """Create and load the shared GenConViT video detector on first use."""
+        async with self._genconvit_lock:
+            if self._genconvit is None:
+                from api.services.genconvit_detector import GenConViTDetector
+                
+                genconvit = GenConViTDetector(device=self._default_device)
+                await asyncio.to_thread(genconvit.load_model)
+                self._genconvit = genconvit
+        return self._genconvit
+    
+    def _preprocess_video(
+        self,
+        video_source: Union[str, bytes],
+        sample_rate: int,
+        genconvit: BaseDetector,
+        npr_detector: Optional[BaseDetector],
+    ) -> Tuple[Optional[torch.Tensor], Optional[torch.Tensor], Dict[str, Any]]:
+        """
+        Decode sampled frames and preprocess them chunk by chunk.
+        
+        Frames are turned into model tensors _FRAME_CHUNK at a time as
+        they are decoded, so only a handful of full-resolution frames are
+        ever alive rather than the whole sampled clip.
+        
+        Returns:
+            Tuple of (GenConViT clip tensor, NPR batch of the leading
+            frames, video metadata); tensors are None when empty
+        """
+        video_info: Dict[str, Any] = {}
+        frames = self._video_processor.iter_frames(
+            video_source, sample_rate=sample_rate, max_frames=30, info=video_info
+        )
+        
+        genconvit_parts: List[torch.Tensor] = []
+        npr_parts: List[torch.Tensor] = []
+        npr_remaining = _PER_FRAME_LIMIT if npr_detector else 0
         
+        while chunk := list(islice(frames, _FRAME_CHUNK)):
+            genconvit_parts.append(genconvit.preprocess_frames(chunk))
+            
+            if npr_remaining > 0:
+                try:
+                    npr_parts.append(npr_detector.preprocess_frames(chunk[:npr_remaining]))
+                    npr_remaining -= len(npr_parts[-1])
+                except Exception as e:
+                    logger.warning(f"Per-frame preprocessing failed: {e}")
+                    npr_parts, npr_remaining = [], 0
+        
+        return (
+            torch.cat(genconvit_parts) if genconvit_parts else None,
+            torch.cat(npr_parts) if npr_parts else None,
+            video_info,
+        )
+    
+    async def _detect_video(
+        self,
+        video_source: Union[str, bytes],
+        sample_rate: int,
+    ) -> Dict[str, Any]:
+        """Run detection on a video using GenConViT and temporal analysis."""
         try:
-            # Initialize components
-            video_processor = VideoProcessor(sample_rate=sample_rate)
-            genconvit = GenConViTDetector(device=self._default_device)
-            temporal_analyzer = TemporalAnalyzer()
+            genconvit = await self._get_genconvit()
+            npr_detector = self.get_detector("npr_detector")
+            if npr_detector:
+                try:
+                    await npr_detector.ensure_loaded()
+                except Exception as e:
+                    logger.warning(f"Per-frame detector unavailable: {e}")
+                    npr_detector = None
             
-            # Extract frames
-            frames, video_info = video_processor.extract_frames(
-                video_bytes,
-                sample_rate=sample_rate,
-                max_frames=30
+            # Decode and preprocess in one pass over the frames
+            frames_tensor, npr_batch, video_info = await asyncio.to_thread(
+                self._preprocess_video,
+                video_source,
+                sample_rate,
+                genconvit,
+                npr_detector,
             )
             
-            if not frames:
+            if frames_tensor is None:
                 return {
                     "is_fake": False,
                     "confidence": 0.0,
@@ -272,28 +615,30 @@ class ModelManager:
                     "video_info": video_info
                 }
             
-            # Run GenConViT detection on video frames
-            genconvit_result = genconvit.detect_video(frames)
+            # Run GenConViT detection on video frames; concurrent videos
+            # share one forward pass through the clip micro-batcher
+            genconvit_result = await self._get_batcher(genconvit, clips=True).submit(frames_tensor)
+            genconvit_result["model_name"] = genconvit.model_name
             
             # Also run per-frame analysis for temporal consistency
             per_frame_predictions = []
-            npr_detector = self.get_detector("npr_detector")
             
-            if npr_detector:
-                for i, frame in enumerate(frames[:10]):  # Limit to first 10 for speed
-                    try:
-                        result = npr_detector.detect(frame)
+            if npr_batch is not None:
+                # One batched forward pass over the leading frames (for speed)
+                try:
+                    npr_results = await run_in_thread(npr_detector.predict_batch, npr_batch)
+                    for i, result in enumerate(npr_results):
                         per_frame_predictions.append({
                             "frame_index": i,
                             "is_fake": result.get("is_fake", False),
                             "fake_probability": result.get("fake_probability", 0.5),
                             "confidence": result.get("confidence", 0.5)
                         })
-                    except Exception as e:
-                        logger.warning(f"Frame {i} detection failed: {e}")
+                except Exception as e:
+                    logger.warning(f"Per-frame detection failed: {e}")
             
             # Temporal analysis
-            temporal_result = temporal_analyzer.analyze_frame_predictions(per_frame_predictions)
+            temporal_result = self._temporal_analyzer.analyze_frame_predictions(per_frame_predictions)
             
             # Combine GenConViT and temporal analysis
             final_confidence = (
@@ -311,7 +656,7 @@ class ModelManager:
                 "genconvit_result": genconvit_result,
                 "temporal_analysis": temporal_result,
                 "video_info": video_info,
-                "frames_analyzed": len(frames),
+                "frames_analyzed": video_info["frames_extracted"],
                 "per_frame_predictions": per_frame_predictions[:5]  # First 5 only
             }
             
@@ -328,3 +673,58 @@ class ModelManager:
 
 # Global instance
 model_manager = ModelManager()
+
+
+_models_initialized = False
+
+
+def initialize_models() -> None:
+    """
+    Register and load detectors for ensemble detection.
+    
+    Idempotent. Runs at import when PRELOAD_MODELS is set (gunicorn
+    preload_app: weights load once in the master and are shared with
+    forked workers copy-on-write), otherwise from the lifespan hook, and
+    in each inference pool process. Lives here rather than in api.main so
+    pool processes don't import the routes (and their module-level models).
+    AUTO_PLACE_DETECTORS needs CUDA, so it always defers to the lifespan
+    hook: a CUDA context in the master breaks the forked workers.
+    """
+    global _models_initialized
+    if _models_initialized:
+        return
+    
+    try:
+        from api.services.universal_fake_detector import UniversalFakeDetector
+        from api.services.npr_detector import NPRDetector
+        
+        # 1. Universal Fake Detector (CLIP-based, semantic features)
+        ufd = UniversalFakeDetector(device="cpu", quantize=settings.QUANTIZE_INT8)
+        model_manager.register_detector(ufd)
+        
+        # 2. NPR Detector (ResNet-based, texture/frequency analysis)
+        npr_weights = Path(__file__).parent.parent.parent / "models" / "NPR.pth"
+        npr = NPRDetector(
+            model_path=npr_weights,
+            device="cpu",
+            quantize=settings.QUANTIZE_INT8,
+        )
+        model_manager.register_detector(npr)
+        
+        if settings.AUTO_PLACE_DETECTORS:
+            model_manager.place_detectors()
+        
+        # Load both at once; cold start takes the slower of the two
+        loaded = model_manager.load_all()
+        if not all(loaded.values()):
+            failed = [name for name, ok in loaded.items() if not ok]
+            print(f"⚠️ Failed to load: {', '.join(failed)}")
+        
+        print("🔗 Ensemble detection enabled (UFD + NPR)")
+        
+    except Exception as e:
+        print(f"⚠️ Failed to load detectors: {e}")
+        import traceback
+        traceback.print_exc()
+    
+    _models_initialized = True
@@ -10,18 +10,24 @@ Model architecture matches official implementation from:
 https://github.com/chuangchuangtan/NPR-DeepfakeDetection
 """
 import time
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Sequence, Union
 from pathlib import Path
 
+import numpy as np
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
 from torch.nn import functional
 from PIL import Image
 
+from api.core.config import get_settings
 from api.services.base import BaseDetector
+from api.services.batching import bucket_sizes, pad_to_bucket
+from api.services.inference_pool import compile_mode
 from api.utils.preprocessing import ImagePreprocessor
 
+settings = get_settings()
+
 
 def conv3x3(in_planes, out_planes, stride=1):
     """3x3 convolution with padding"""
@@ -148,19 +154,30 @@ class NPRDetector(BaseDetector):
     Extends BaseDetector with NPR-specific model and preprocessing.
     """
     
+    memory_estimate = 256 * 1024 ** 2  # layer1/layer2 ResNet, ~1.5M params
+    
     def __init__(
         self,
         model_path: Optional[Path] = None,
         device: str = "cpu",
         confidence_threshold: float = 0.5,
+        quantize: bool = False,
+        compile: Optional[bool] = None,
+        freeze: Optional[bool] = None,
     ):
         super().__init__(
             model_name="npr_detector",
             model_path=model_path,
             device=device,
             confidence_threshold=confidence_threshold,
+            quantize=quantize,
         )
         
+        self.compile = settings.TORCH_COMPILE if compile is None else compile
+        self.freeze = settings.JIT_FREEZE if freeze is None else freeze
+        self._copy_stream = None
+        self._buckets: Optional[List[int]] = None  # Padded batch sizes when compiled
+        
         # Initialize preprocessor
         self.preprocessor = ImagePreprocessor(
             target_size=(224, 224),
@@ -174,19 +191,154 @@ class NPRDetector(BaseDetector):
         
         # Load custom weights if available
         if self.model_path and self.model_path.exists():
-            state_dict = torch.load(
-                self.model_path,
-                map_location=self.device
-            )
-            self.model.load_state_dict(state_dict, strict=False)
+            state_dict = self._load_weights(self.model_path)
+            self.model.load_state_dict(state_dict, strict=False, assign=True)
             print(f"✅ Loaded NPR weights from {self.model_path}")
         else:
             print("⚠️ NPR using pretrained ImageNet weights (download NPR weights for better accuracy)")
         
         self.model.to(self.device)
         self.model.eval()
+        self._fuse_conv_bn()
+        
+        # NHWC matches cuDNN's preferred conv layout
+        self.model = self.model.to(memory_format=torch.channels_last)
+        
+        if torch.device(self.device).type == "cuda":
+            # Side stream for input copies (see _upload)
+            self._copy_stream = torch.cuda.Stream(device=self.device)
+        
+        if self.is_quantized:
+            if not self._quantize_static():
+                self.model = self._quantize_dynamic(self.model)
+        elif self.compile:
+            self._compile_model()
+        elif self.freeze and torch.device(self.device).type == "cpu":
+            self._freeze_model()
+        
         self._is_loaded = True
     
+    def _fuse_conv_bn(self) -> None:
+        """
+        Fold every BatchNorm into the convolution before it (eval only).
+        
+        Each conv then writes its normalized output directly instead of
+        making a second pass over the activations for BN; the BN modules
+        become nn.Identity.
+        """
+        fuse = nn.utils.fuse_conv_bn_eval
+        model = self.model
+        
+        model.conv1, model.bn1 = fuse(model.conv1, model.bn1), nn.Identity()
+        for block in model.modules():
+            if isinstance(block, Bottleneck):
+                block.conv1, block.bn1 = fuse(block.conv1, block.bn1), nn.Identity()
+                block.conv2, block.bn2 = fuse(block.conv2, block.bn2), nn.Identity()
+                block.conv3, block.bn3 = fuse(block.conv3, block.bn3), nn.Identity()
+                if block.downsample is not None:
+                    conv, bn = block.downsample
+                    block.downsample = nn.Sequential(fuse(conv, bn))
+    
+    def _quantize_static(self, max_images: int = 32) -> bool:
+        """
+        Quantize the whole network to int8 with FX static quantization.
+        
+        Dynamic quantization only covers Linear layers, which for NPR is
+        just the final fc; static quantization also runs the convolutions
+        in int8. Activation ranges are calibrated on the images in
+        NPR_CALIBRATION_DIR, so without them this is a no-op.
+        
+        Args:
+            max_images: Calibration images to use
+            
+        Returns:
+            True if the model was quantized
+        """
+        calibration_dir = settings.NPR_CALIBRATION_DIR
+        if not calibration_dir or not Path(calibration_dir).is_dir():
+            return False
+        
+        images = sorted(
+            path for path in Path(calibration_dir).iterdir()
+            if path.suffix.lower() in {".jpg", ".jpeg", ".png", ".webp"}
+        )[:max_images]
+        if not images:
+            print(f"⚠️ No calibration images in {calibration_dir}, using dynamic quantization")
+            return False
+        
+        try:
+            from torch.ao.quantization import get_default_qconfig_mapping
+            from torch.ao.quantization.quantize_fx import convert_fx, prepare_fx
+            
+            engines = torch.backends.quantized.supported_engines
+            engine = "x86" if "x86" in engines else "fbgemm"
+            torch.backends.quantized.engine = engine
+            
+            example = self.preprocess_frames([Image.open(images[0]).convert("RGB")])
+            prepared = prepare_fx(self.model, get_default_qconfig_mapping(engine), (example,))
+            
+            # Observers record activation ranges; no_grad (not inference_mode)
+            # so they can update their buffers in place
+            with torch.no_grad():
+                for path in images:
+                    prepared(self.preprocess_frames([Image.open(path).convert("RGB")]))
+            
+            self.model = convert_fx(prepared)
+            print(f"✅ NPR statically quantized to int8 ({engine}, {len(images)} calibration images)")
+            return True
+        except Exception as e:
+            print(f"⚠️ NPR static quantization failed, using dynamic quantization: {e}")
+            return False
+    
+    def _freeze_model(self) -> None:
+        """
+        Trace, freeze and optimize the model for CPU inference.
+        
+        The whole forward becomes one TorchScript graph with conv/bn/relu
+        fused and weights pre-packed for oneDNN, so a call no longer
+        dispatches each layer from Python. The batch dimension stays
+        dynamic. Falls back to eager on failure.
+        """
+        dummy = torch.zeros(1, 3, 224, 224).to(memory_format=torch.channels_last)
+        try:
+            with torch.no_grad():
+                traced = torch.jit.trace(self.model, dummy)
+                frozen = torch.jit.optimize_for_inference(traced)
+                frozen(dummy)
+            self.model = frozen
+            print("✅ NPR frozen for CPU inference")
+        except Exception as e:
+            print(f"⚠️ NPR freeze failed, using eager: {e}")
+    
+    def _compile_model(self) -> None:
+        """
+        Compile the model and warm it up on every bucket.
+        
+        Batches range from one image up to a micro-batch (BATCH_MAX_SIZE)
+        or a video's 10 leading frames, so they are padded to a few fixed
+        sizes; the warm-up pays each compile at load time rather than on
+        live requests.
+        """
+        device_type = torch.device(self.device).type
+        self.model = torch.compile(
+            self.model,
+            mode=compile_mode(device_type),
+            dynamic=False,
+        )
+        self._buckets = bucket_sizes(max(settings.BATCH_MAX_SIZE, 10))
+        
+        with torch.inference_mode(), torch.autocast(
+            device_type=device_type,
+            dtype=torch.bfloat16,
+            enabled=device_type == "cuda",
+        ):
+            for size in self._buckets:
+                dummy = torch.zeros(size, 3, 224, 224, device=self.device).to(
+                    memory_format=torch.channels_last
+                )
+                self.model(dummy)
+        print(f"✅ NPR compiled for batch sizes {self._buckets}")
+    
     def preprocess(self, image: Image.Image) -> torch.Tensor:
         """
         Preprocess image for NPR model.
@@ -197,38 +349,118 @@ class NPRDetector(BaseDetector):
         Returns:
             Preprocessed tensor (1, 3, 224, 224)
         """
-        return self.preprocessor.preprocess(image).to(self.device)
+        return self._upload(self.preprocessor.preprocess(image))
+    
+    def preprocess_frames(
+        self,
+        frames: Sequence[Union[Image.Image, np.ndarray]],
+    ) -> torch.Tensor:
+        """
+        Preprocess video frames into one batch.
+        
+        Args:
+            frames: PIL Images or RGB uint8 arrays
+            
+        Returns:
+            Batch tensor (N, 3, 224, 224)
+        """
+        images = [
+            Image.fromarray(frame) if isinstance(frame, np.ndarray) else frame
+            for frame in frames
+        ]
+        return self._upload(self.preprocessor.preprocess_batch(images))
+    
+    def _upload(self, tensor: torch.Tensor) -> torch.Tensor:
+        """
+        Move a preprocessed CPU batch to the device as channels_last.
+        
+        On GPU the batch is pinned and copied asynchronously on the
+        detector's copy stream, so the copy overlaps with forwards already
+        running on other streams. It is then handed to the device's default
+        stream, which MicroBatcher's side streams (and direct predict
+        calls) wait on, rather than to whatever stream the caller is on.
+        """
+        tensor = tensor.contiguous(memory_format=torch.channels_last)
+        if self._copy_stream is None:
+            return tensor.to(self.device)
+        
+        host = tensor.pin_memory()
+        with torch.cuda.stream(self._copy_stream):
+            device_tensor = host.to(self.device, non_blocking=True)
+        
+        handoff = torch.cuda.default_stream(self.device)
+        handoff.wait_stream(self._copy_stream)
+        # Allocated on the copy stream but consumed from the default one
+        device_tensor.record_stream(handoff)
+        return device_tensor
     
-    def predict(self, input_data: torch.Tensor) -> Dict[str, Any]:
+    def predict(self, input_data: torch.Tensor, return_raw: bool = False) -> Dict[str, Any]:
         """
         Run NPR inference.
         
         Args:
             input_data: Preprocessed tensor
+            return_raw: Include [[real, fake]] probabilities as raw_output
+            
+        Returns:
+            Detection result with is_fake, confidence (and raw_output)
+        """
+        return self.predict_batch(input_data, return_raw)[0]
+    
+    def predict_batch(
+        self,
+        input_batch: torch.Tensor,
+        return_raw: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """
+        Run NPR inference on a batch in a single forward pass.
+        
+        Args:
+            input_batch: Preprocessed tensor (N, 3, 224, 224)
+            return_raw: Include [[real, fake]] probabilities as raw_output
             
         Returns:
-            Detection result with is_fake, confidence, raw_output
+            One detection result per image
         """
         start_time = time.time()
         
-        with torch.no_grad():
-            # Get fake probability (sigmoid output)
-            fake_prob = self.model.predict_proba(input_data).item()
-            real_prob = 1.0 - fake_prob
+        # bf16 autocast on GPU only; CPU stays fp32
+        device_type = torch.device(self.device).type
+        with torch.inference_mode(), torch.autocast(
+            device_type=device_type,
+            dtype=torch.bfloat16,
+            enabled=device_type == "cuda",
+        ):
+            if self._buckets is not None:
+                # Padded to a warmed-up shape; the padding rows are dropped
+                logits = self.model(pad_to_bucket(input_batch, self._buckets))[:input_batch.shape[0]]
+            else:
+                logits = self.model(input_batch)
+            
+            # Sigmoid in fp32 so probabilities near the threshold keep their precision
+            fake_probs = torch.sigmoid(logits.float()).view(-1).tolist()
         
         processing_time = (time.time() - start_time) * 1000  # ms
         
-        # Determine prediction based on threshold
-        is_fake = fake_prob >= self.confidence_threshold
-        
-        return {
-            "is_fake": is_fake,
-            "confidence": fake_prob if is_fake else real_prob,
-            "fake_probability": fake_prob,
-            "real_probability": real_prob,
-            "processing_time_ms": processing_time,
-            "raw_output": [[real_prob, fake_prob]]
-        }
+        results = []
+        for fake_prob in fake_probs:
+            real_prob = 1.0 - fake_prob
+            
+            # Determine prediction based on threshold
+            is_fake = fake_prob >= self.confidence_threshold
+            
+            result = {
+                "is_fake": is_fake,
+                "confidence": fake_prob if is_fake else real_prob,
+                "fake_probability": fake_prob,
+                "real_probability": real_prob,
+                "processing_time_ms": processing_time,
+            }
+            if return_raw:
+                result["raw_output"] = [[real_prob, fake_prob]]
+            results.append(result)
+        
+        return results
     
     async def detect_async(
         self,
@@ -243,14 +475,13 @@ class NPRDetector(BaseDetector):
         Returns:
             Detection result
         """
-        if not self.is_loaded:
-            self.load_model()
+        await self.ensure_loaded()
         
         # Preprocess
-        tensor = self.preprocessor.preprocess(image_bytes).to(self.device)
+        tensor = self._upload(self.preprocessor.preprocess(image_bytes))
         
         # Run prediction
-        result = self.predict(tensor)
+        result = self.predict(tensor, return_raw=True)
         result["model_name"] = self.model_name
         
         return result
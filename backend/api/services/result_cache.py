@@ -0,0 +1,89 @@
+"""
+Result Cache - LRU + TTL cache of detection results keyed by upload content.
+
+Duplicate uploads (re-shared images, retried requests) are answered from
+the cache instead of re-running the pipeline. Keys combine the endpoint,
+any result-affecting options, and the SHA-256 digest of the file bytes;
+hashlib dispatches to SHA-NI / ARMv8 crypto extensions where available.
+"""
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from api.core.config import get_settings
+
+settings = get_settings()
+
+
+def content_digest(data: bytes) -> bytes:
+    """SHA-256 digest of an upload."""
+    return hashlib.sha256(data).digest()
+
+
+class ResultCache:
+    """
+    Bounded LRU cache with per-entry expiry.
+
+    Only touched from the event loop, so no locking is needed.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 600.0):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries: Maximum cached results (0 disables the cache)
+            ttl_seconds: Seconds a result stays valid
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[Dict[str, Any]]:
+        """
+        Return a cached result, or None on a miss or expired entry.
+
+        Args:
+            key: Cache key (endpoint, options, content digest)
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, result = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return result
+
+    def put(self, key: Hashable, result: Dict[str, Any]) -> None:
+        """
+        Cache a successful result, evicting the least recently used entry.
+
+        Results carrying an "error" are not cached.
+
+        Args:
+            key: Cache key (endpoint, options, content digest)
+            result: Detection result
+        """
+        if self.max_entries <= 0 or result.get("error"):
+            return
+
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop all cached results."""
+        self._entries.clear()
+
+
+# Global instance
+result_cache = ResultCache(
+    max_entries=settings.RESULT_CACHE_SIZE,
+    ttl_seconds=settings.RESULT_CACHE_TTL_SECONDS,
+)
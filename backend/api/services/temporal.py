@@ -55,27 +55,34 @@ class TemporalAnalyzer:
             }
         
         # Extract confidence scores
-        confidences = [p.get("fake_probability", 0.5) for p in predictions]
-        is_fake_list = [p.get("is_fake", False) for p in predictions]
+        count = len(predictions)
+        confidences = np.fromiter(
+            (p.get("fake_probability", 0.5) for p in predictions), dtype=np.float64, count=count
+        )
+        is_fake = np.fromiter(
+            (p.get("is_fake", False) for p in predictions), dtype=bool, count=count
+        )
         
         # Calculate consistency metrics
-        variance = np.var(confidences)
-        mean_confidence = np.mean(confidences)
-        
-        # Check for flickering (sudden changes)
-        flicker_points = []
-        for i in range(1, len(confidences)):
-            diff = abs(confidences[i] - confidences[i-1])
-            if diff > self.flicker_threshold:
-                flicker_points.append({
-                    "frame_index": i,
-                    "confidence_jump": diff,
-                    "from": confidences[i-1],
-                    "to": confidences[i]
-                })
+        variance = float(confidences.var())
+        mean_confidence = float(confidences.mean())
+        
+        # Check for flickering (sudden changes between consecutive frames)
+        jumps = np.abs(np.diff(confidences))
+        flicker_indices = np.flatnonzero(jumps > self.flicker_threshold)
+        flicker_points = [
+            {
+                "frame_index": int(i) + 1,
+                "confidence_jump": float(jumps[i]),
+                "from": float(confidences[i]),
+                "to": float(confidences[i + 1])
+            }
+            for i in flicker_indices[:5]  # Limit to first 5
+        ]
+        flicker_count = len(flicker_indices)
         
         # Check prediction consistency
-        fake_ratio = sum(is_fake_list) / len(is_fake_list)
+        fake_ratio = float(is_fake.mean())
         is_consistent = bool(variance < self.consistency_threshold)
         
         # Temporal artifacts
@@ -87,22 +94,22 @@ class TemporalAnalyzer:
                 "variance": float(variance)
             })
         
-        if flicker_points:
+        if flicker_count:
             artifacts.append({
                 "type": "flickering",
                 "description": "Sudden changes in prediction confidence",
-                "flicker_count": len(flicker_points),
-                "flicker_points": flicker_points[:5]  # Limit to first 5
+                "flicker_count": flicker_count,
+                "flicker_points": flicker_points
             })
         
         return {
             "is_consistent": is_consistent,
             "consistency_score": 1.0 - min(variance * 2, 1.0),
-            "mean_confidence": float(mean_confidence),
-            "variance": float(variance),
-            "fake_frame_ratio": float(fake_ratio),
-            "flicker_detected": len(flicker_points) > 0,
-            "flicker_count": len(flicker_points),
+            "mean_confidence": mean_confidence,
+            "variance": variance,
+            "fake_frame_ratio": fake_ratio,
+            "flicker_detected": flicker_count > 0,
+            "flicker_count": flicker_count,
             "temporal_artifacts": artifacts
         }
     
@@ -129,19 +136,23 @@ class TemporalAnalyzer:
             }
         
         # Weighted voting based on confidence
-        fake_votes = sum(1 for p in predictions if p.get("is_fake", False))
-        total_votes = len(predictions)
+        count = len(predictions)
+        votes = np.fromiter(
+            (p.get("is_fake", False) for p in predictions), dtype=bool, count=count
+        )
         
         # Mean and max confidence
-        confidences = [p.get("fake_probability", 0.5) for p in predictions]
-        mean_conf = np.mean(confidences)
-        max_conf = np.max(confidences)
+        confidences = np.fromiter(
+            (p.get("fake_probability", 0.5) for p in predictions), dtype=np.float64, count=count
+        )
+        mean_conf = float(confidences.mean())
+        max_conf = float(confidences.max())
         
         # Temporal penalty for inconsistent predictions
         consistency_score = temporal_analysis.get("consistency_score", 1.0)
         
         # Final decision
-        fake_ratio = fake_votes / total_votes
+        fake_ratio = float(votes.mean())
         
         # High flickering is suspicious (could indicate per-frame manipulation)
         flicker_bonus = 0.1 if temporal_analysis.get("flicker_detected", False) else 0
@@ -1,5 +1,12 @@
 """Utilities module for image/video processing."""
-from api.utils.preprocessing import ImagePreprocessor
+from api.utils.preprocessing import ImagePreprocessor, decode_image
 from api.utils.video import VideoProcessor
+from api.utils.uploads import StreamedUpload, stream_upload_to_disk
 
-__all__ = ["ImagePreprocessor", "VideoProcessor"]
+__all__ = [
+    "ImagePreprocessor",
+    "VideoProcessor",
+    "decode_image",
+    "StreamedUpload",
+    "stream_upload_to_disk",
+]
@@ -13,6 +13,67 @@ from PIL import Image
 import torch
 from torchvision import transforms
 
+# PyTurboJPEG is optional; PIL is used when it (or libturbojpeg) is unavailable
+try:
+    from turbojpeg import TurboJPEG, TJPF_RGB
+    _turbo_jpeg = TurboJPEG()
+except Exception:
+    _turbo_jpeg = None
+
+JPEG_CONTENT_TYPES = frozenset({"image/jpeg", "image/jpg"})
+
+
+def _jpeg_scaling_factor(width: int, height: int, min_size: int) -> Tuple[int, int]:
+    """Pick the smallest DCT scaling factor that keeps both sides >= min_size."""
+    best = (1, 1)
+    for num, denom in _turbo_jpeg.scaling_factors:
+        if num / denom >= best[0] / best[1]:
+            continue
+        if min(width, height) * num / denom >= min_size:
+            best = (num, denom)
+    return best
+
+
+def decode_image(
+    image_bytes: bytes,
+    content_type: Optional[str] = None,
+    min_size: int = 224,
+) -> Image.Image:
+    """
+    Decode uploaded image bytes to an RGB PIL Image.
+    
+    JPEGs are decoded with libjpeg-turbo when available, downscaled in
+    the DCT domain as far as possible while keeping the short side at
+    least `min_size` pixels (the model input size). Other formats, or
+    any turbo decode failure, fall back to PIL.
+    
+    Args:
+        image_bytes: Raw image bytes
+        content_type: MIME type reported by the client, if any
+        min_size: Smallest side the detectors need before resizing
+        
+    Returns:
+        PIL Image in RGB mode
+    """
+    is_jpeg = content_type in JPEG_CONTENT_TYPES or image_bytes[:2] == b"\xff\xd8"
+    
+    if _turbo_jpeg is not None and is_jpeg:
+        try:
+            width, height, _, _ = _turbo_jpeg.decode_header(image_bytes)
+            rgb = _turbo_jpeg.decode(
+                image_bytes,
+                pixel_format=TJPF_RGB,
+                scaling_factor=_jpeg_scaling_factor(width, height, min_size),
+            )
+            return Image.fromarray(rgb)
+        except Exception:
+            pass
+    
+    img = Image.open(io.BytesIO(image_bytes))
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+    return img
+
 
 class ImagePreprocessor:
     """
@@ -82,7 +143,8 @@ class ImagePreprocessor:
         if isinstance(source, Image.Image):
             img = source
         elif isinstance(source, bytes):
-            img = Image.open(io.BytesIO(source))
+            # libjpeg-turbo (DCT-downscaled) for JPEGs, PIL otherwise
+            return decode_image(source, min_size=min(self.target_size))
         elif isinstance(source, (str, Path)):
             img = Image.open(source)
         else:
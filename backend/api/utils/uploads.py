@@ -0,0 +1,158 @@
+"""
+Streaming Upload Utilities
+
+Parses multipart/form-data straight off the request body and writes the
+file part to a temp file, skipping Starlette's SpooledTemporaryFile so
+large uploads are never held (or copied) in memory.
+"""
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, List, Optional
+
+import aiofiles.tempfile
+from starlette.requests import Request
+
+try:
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ImportError:  # python-multipart < 0.0.13
+    from multipart.multipart import MultipartParser, parse_options_header
+
+
+@dataclass
+class StreamedUpload:
+    """A file part written to disk by stream_upload_to_disk()."""
+    path: str
+    filename: Optional[str]
+    content_type: Optional[str]
+
+
+class _FilePart:
+    """Parser callbacks collecting the target file part's headers and data."""
+
+    def __init__(self, field_name: str):
+        self.field_name = field_name.encode("latin-1")
+        self.headers = {}
+        self._header_field: List[bytes] = []
+        self._header_value: List[bytes] = []
+        self.in_target = False
+        self.found = False
+        self.filename: Optional[str] = None
+        self.content_type: Optional[str] = None
+        self.pending: List[bytes] = []
+
+    def callbacks(self) -> dict:
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+        }
+
+    def on_part_begin(self) -> None:
+        self.headers = {}
+
+    def on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_field.append(data[start:end])
+
+    def on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value.append(data[start:end])
+
+    def on_header_end(self) -> None:
+        name = b"".join(self._header_field).lower()
+        self.headers[name] = b"".join(self._header_value)
+        self._header_field.clear()
+        self._header_value.clear()
+
+    def on_headers_finished(self) -> None:
+        _, options = parse_options_header(self.headers.get(b"content-disposition"))
+        filename = options.get(b"filename")
+        self.in_target = (
+            not self.found
+            and options.get(b"name") == self.field_name
+            and filename is not None
+        )
+        if self.in_target:
+            self.found = True
+            self.filename = filename.decode("utf-8", "replace")
+            content_type = self.headers.get(b"content-type")
+            self.content_type = content_type.decode("latin-1").strip() if content_type else None
+
+    def on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self.in_target:
+            self.pending.append(data[start:end])
+
+    def on_part_end(self) -> None:
+        self.in_target = False
+
+
+async def stream_upload_to_disk(
+    request: Request,
+    field_name: str = "file",
+    allowed_types: Optional[frozenset] = None,
+    default_suffix: str = ".mp4",
+    hasher: Optional[Any] = None,
+) -> StreamedUpload:
+    """
+    Stream one file field of a multipart request body into a named temp file.
+
+    The caller is responsible for removing the returned path.
+
+    Args:
+        request: Incoming multipart/form-data request
+        field_name: Form field holding the file
+        allowed_types: Accepted part Content-Types (checked before any
+            data is written; None accepts all)
+        default_suffix: Extension to use when the filename has none
+        hasher: Optional hashlib object fed the file bytes as they arrive
+
+    Returns:
+        StreamedUpload with the temp path, filename and part Content-Type
+
+    Raises:
+        ValueError: Not multipart, field missing, or disallowed type
+    """
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    boundary = params.get(b"boundary")
+    if content_type != b"multipart/form-data" or not boundary:
+        raise ValueError("Expected a multipart/form-data body")
+
+    part = _FilePart(field_name)
+    parser = MultipartParser(boundary, part.callbacks())
+    tmp = None
+
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+
+            if part.found and tmp is None:
+                if allowed_types is not None and part.content_type not in allowed_types:
+                    raise ValueError(
+                        f"Invalid file type. Allowed: {sorted(allowed_types)}"
+                    )
+                suffix = Path(part.filename or "").suffix or default_suffix
+                tmp = await aiofiles.tempfile.NamedTemporaryFile(
+                    "wb", suffix=suffix, delete=False
+                )
+
+            for piece in part.pending:
+                if hasher is not None:
+                    hasher.update(piece)
+                await tmp.write(piece)
+            part.pending.clear()
+
+        parser.finalize()
+    except BaseException:
+        if tmp is not None:
+            await tmp.close()
+            os.remove(tmp.name)
+        raise
+
+    if tmp is None:
+        raise ValueError(f"Missing file field '{field_name}'")
+
+    await tmp.close()
+    return StreamedUpload(path=tmp.name, filename=part.filename, content_type=part.content_type)
@@ -4,15 +4,28 @@ Video Processing Utilities
 Handles video frame extraction and metadata using OpenCV.
 """
 import io
+import logging
+import shutil
+import subprocess
 import tempfile
 import os
-from typing import List, Tuple, Optional, Dict, Any
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 from pathlib import Path
 
 import cv2
 import numpy as np
 from PIL import Image
 
+try:
+    import av  # PyAV, for keyframe seeking
+except ImportError:
+    av = None
+
+logger = logging.getLogger(__name__)
+
+# ffmpeg binary for the YUV420 decode path (None -> OpenCV only)
+FFMPEG_PATH = shutil.which("ffmpeg")
+
 
 class VideoProcessor:
     """
@@ -25,14 +38,17 @@ class VideoProcessor:
     # Supported video formats
     SUPPORTED_FORMATS = [".mp4", ".avi", ".mov", ".mkv", ".webm"]
     
-    def __init__(self, sample_rate: int = 10):
+    def __init__(self, sample_rate: int = 10, color_space: str = "yuv420p"):
         """
         Initialize the video processor.
         
         Args:
             sample_rate: Extract every Nth frame (default: every 10th frame)
+            color_space: Decoder output format, "yuv420p" (ffmpeg pipe,
+                half the bytes of RGB) or "rgb" (OpenCV)
         """
         self.sample_rate = sample_rate
+        self.color_space = color_space
         self._temp_file: Optional[str] = None
     
     def get_video_info(self, video_path: str) -> Dict[str, Any]:
@@ -75,14 +91,16 @@ class VideoProcessor:
         Returns:
             Path to temporary file
         """
-        # Create temp file
+        temp_path = self._write_temp_video(video_bytes)
+        self._temp_file = temp_path
+        return temp_path
+    
+    @staticmethod
+    def _write_temp_video(video_bytes: bytes) -> str:
+        """Write video bytes to a new temp file and return its path (caller removes it)."""
         fd, temp_path = tempfile.mkstemp(suffix=".mp4")
-        os.close(fd)
-        
-        with open(temp_path, "wb") as f:
+        with os.fdopen(fd, "wb") as f:
             f.write(video_bytes)
-        
-        self._temp_file = temp_path
         return temp_path
     
     def cleanup(self) -> None:
@@ -108,53 +126,224 @@ class VideoProcessor:
         Returns:
             Tuple of (list of PIL Images, video metadata)
         """
+        info: Dict[str, Any] = {}
+        frames = list(self.iter_frames(video_source, sample_rate, max_frames, info))
+        return frames, info
+    
+    def iter_frames(
+        self,
+        video_source: str | bytes,
+        sample_rate: Optional[int] = None,
+        max_frames: int = 30,
+        info: Optional[Dict[str, Any]] = None,
+    ) -> Iterator[Image.Image]:
+        """
+        Decode sampled frames one at a time.
+        
+        Callers that preprocess as they go only hold a few full-size
+        frames at once instead of all of them.
+        
+        Args:
+            video_source: Video file path or bytes
+            sample_rate: Override default sample rate
+            max_frames: Maximum number of frames to extract
+            info: Filled with the video metadata extract_frames() returns
+                (frame counts once the iterator is exhausted or closed)
+            
+        Yields:
+            Sampled frames as PIL Images
+        """
         rate = sample_rate or self.sample_rate
+        info = {} if info is None else info
+        frame_indices: List[int] = []
         
-        # Handle bytes input
+        # Handle bytes input. The temp path stays local (not self._temp_file)
+        # so one processor can serve concurrent requests.
+        temp_path = None
         if isinstance(video_source, bytes):
-            video_path = self.save_temp_video(video_source)
+            video_path = temp_path = self._write_temp_video(video_source)
         else:
             video_path = video_source
         
         try:
             # Get video info
-            info = self.get_video_info(video_path)
+            info.update(self.get_video_info(video_path))
+            
+            if self._use_yuv_pipe(info):
+                try:
+                    for i, frame in enumerate(self._iter_frames_yuv(
+                        video_path, info["width"], info["height"], rate, max_frames
+                    )):
+                        frame_indices.append(i * rate)
+                        yield frame
+                    return
+                except RuntimeError as e:
+                    # Nothing decoded yet, so OpenCV can start from scratch
+                    logger.warning(f"ffmpeg decode failed, falling back to OpenCV: {e}")
             
             # Open video
             cap = cv2.VideoCapture(video_path)
-            frames: List[Image.Image] = []
-            frame_indices: List[int] = []
             frame_idx = 0
             
-            while cap.isOpened() and len(frames) < max_frames:
-                ret, frame = cap.read()
-                if not ret:
-                    break
-                
-                # Sample every Nth frame
-                if frame_idx % rate == 0:
-                    # Convert BGR to RGB
-                    rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                    # Convert to PIL Image
-                    pil_image = Image.fromarray(rgb_frame)
-                    frames.append(pil_image)
-                    frame_indices.append(frame_idx)
-                
-                frame_idx += 1
-            
-            cap.release()
+            try:
+                while cap.isOpened() and len(frame_indices) < max_frames:
+                    ret, frame = cap.read()
+                    if not ret:
+                        break
+                    
+                    # Sample every Nth frame
+                    if frame_idx % rate == 0:
+                        # Convert BGR to RGB
+                        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                        frame_indices.append(frame_idx)
+                        # Convert to PIL Image
+                        yield Image.fromarray(rgb_frame)
+                    
+                    frame_idx += 1
+            finally:
+                cap.release()
             
+        finally:
             # Add extraction info to metadata
-            info["frames_extracted"] = len(frames)
+            info["frames_extracted"] = len(frame_indices)
             info["sample_rate"] = rate
             info["frame_indices"] = frame_indices
             
-            return frames, info
-            
-        finally:
             # Cleanup temp file if we created one
-            if isinstance(video_source, bytes):
-                self.cleanup()
+            if temp_path is not None:
+                os.remove(temp_path)
+    
+    def _use_yuv_pipe(self, info: Dict[str, Any]) -> bool:
+        """Whether the ffmpeg YUV420 path can decode this video."""
+        width, height = info.get("width", 0), info.get("height", 0)
+        return (
+            self.color_space == "yuv420p"
+            and FFMPEG_PATH is not None
+            and width > 0 and height > 0
+            and width % 2 == 0 and height % 2 == 0  # I420 conversion needs even dims
+        )
+    
+    def _iter_frames_yuv(
+        self,
+        video_path: str,
+        width: int,
+        height: int,
+        rate: int,
+        max_frames: int
+    ) -> Iterator[Image.Image]:
+        """
+        Decode sampled frames through an ffmpeg rawvideo yuv420p pipe.
+        
+        ffmpeg drops unsampled frames itself and ships 12 bits per pixel
+        instead of 24; each frame is converted with one cv2 I420->RGB call.
+        Frame i comes from source frame i * rate.
+        
+        Yields:
+            Sampled frames as PIL Images
+            
+        Raises:
+            RuntimeError: ffmpeg produced no frames (its error output is
+                in the message); later failures only end the stream early
+        """
+        frame_size = width * height * 3 // 2
+        cmd = [
+            FFMPEG_PATH, "-v", "error", "-nostdin",
+            "-noautorotate",  # Keep frames at the stream size OpenCV reported
+            "-i", video_path,
+            "-vf", f"select=not(mod(n\\,{rate}))",
+            "-fps_mode", "passthrough",
+            "-frames:v", str(max_frames),
+            "-f", "rawvideo", "-pix_fmt", "yuv420p",
+            "pipe:1",
+        ]
+        
+        # stderr goes to a file, not a pipe nobody drains while we read stdout
+        with tempfile.TemporaryFile() as stderr:
+            proc = subprocess.Popen(
+                cmd,
+                stdout=subprocess.PIPE,
+                stderr=stderr,
+                bufsize=1 << 20,
+            )
+            decoded = 0
+            try:
+                while decoded < max_frames:
+                    buf = proc.stdout.read(frame_size)
+                    if len(buf) < frame_size:
+                        break
+                    decoded += 1
+                    yuv = np.frombuffer(buf, dtype=np.uint8).reshape(height * 3 // 2, width)
+                    yield Image.fromarray(cv2.cvtColor(yuv, cv2.COLOR_YUV2RGB_I420))
+                
+                if decoded < max_frames:
+                    # ffmpeg stopped on its own, so its exit status means something
+                    returncode = proc.wait()
+                    if returncode != 0 or decoded == 0:
+                        stderr.seek(0)
+                        message = stderr.read().decode(errors="replace").strip()
+                        error = f"ffmpeg exited with {returncode} after {decoded} frames: {message}"
+                        if decoded == 0:
+                            raise RuntimeError(error)
+                        logger.warning(error)
+            finally:
+                proc.stdout.close()
+                proc.kill()
+                proc.wait()
+    
+    def extract_keyframes(
+        self,
+        video_path: str,
+        num_frames: int
+    ) -> Optional[np.ndarray]:
+        """
+        Sample num_frames frames spread over the video by seeking to keyframes.
+        
+        Each sample seeks backward to the nearest I-frame and decodes only
+        that frame, so cost is O(num_frames) instead of decoding every
+        intervening P/B frame.
+        
+        Args:
+            video_path: Path to video file
+            num_frames: Number of frames to sample
+            
+        Returns:
+            (N, H, W, 3) RGB array, or None when keyframe seeking isn't
+            usable (no PyAV, variable frame rate, unknown duration, or too
+            few distinct keyframes) and the caller should decode linearly
+        """
+        if av is None or num_frames <= 0:
+            return None
+        
+        try:
+            with av.open(video_path) as container:
+                stream = container.streams.video[0]
+                
+                # VFR streams don't map evenly-spaced timestamps to evenly-spaced frames
+                if not stream.average_rate or stream.average_rate != stream.guessed_rate:
+                    return None
+                if not stream.duration:
+                    return None
+                
+                start = stream.start_time or 0
+                targets = np.linspace(start, start + stream.duration - 1, num_frames, dtype=np.int64)
+                
+                frames = []
+                seen_pts = set()
+                for pts in targets:
+                    container.seek(int(pts), stream=stream, any_frame=False, backward=True)
+                    frame = next(container.decode(stream), None)
+                    if frame is None or frame.pts in seen_pts:
+                        continue
+                    seen_pts.add(frame.pts)
+                    frames.append(frame.to_ndarray(format="rgb24"))
+        except (av.error.FFmpegError, IndexError, ValueError):
+            return None
+        
+        # Long GOPs collapse several targets onto one keyframe
+        if len(frames) < max(1, num_frames // 2):
+            return None
+        
+        return np.stack(frames)
     
     def extract_frames_with_timestamps(
         self,
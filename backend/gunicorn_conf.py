@@ -0,0 +1,23 @@
+"""
+Gunicorn configuration for the MacroBlank API.
+
+Usage:
+    gunicorn -c gunicorn_conf.py api.main:app
+
+Models are loaded once in the master (preload_app) and inherited by the
+forked workers; with mmap-backed weights the pages stay shared
+copy-on-write instead of being duplicated per worker.
+"""
+import os
+
+# Must be set before torch is imported by the preloaded app
+os.environ.setdefault("PRELOAD_MODELS", "true")
+os.environ.setdefault("OMP_NUM_THREADS", "1")  # Avoid thread oversubscription across workers
+# Read back by the app to size its inference process pool
+os.environ.setdefault("WEB_CONCURRENCY", "2")
+
+bind = f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', '8000')}"
+workers = int(os.environ["WEB_CONCURRENCY"])
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+timeout = 120
@@ -1,3 +1,5 @@
+from typing import BinaryIO, Union
+
 import torch
 import librosa
 from transformers import Wav2Vec2ForSequenceClassification, Wav2Vec2FeatureExtractor
@@ -20,10 +22,11 @@ class AudioDeepfakeDetector:
         except Exception as e:
             raise RuntimeError(f"Architecture Layer 3 Error: Failed to initialize Wav2Vec2: {str(e)}")
 
-    def predict(self, audio_path: str):
+    def predict(self, audio_path: Union[str, BinaryIO]):
         # 1. Preprocessing: Load and resample to 16kHz as required by Wav2Vec2
         try:
-            # librosa handles various formats (wav, mp3, etc.)
+            # librosa handles various formats (wav, mp3, etc.) from a path,
+            # or libsndfile formats (wav, flac, ogg) from a file-like object
             speech, _ = librosa.load(audio_path, sr=16000)
         except Exception as e:
             return {"error": f"Preprocessing Error: {str(e)}"}
@@ -33,7 +36,7 @@ class AudioDeepfakeDetector:
         inputs = {k: v.to(self.device) for k, v in inputs.items()}
 
         # 3. Inference: Forward pass through the transformer layers
-        with torch.no_grad():
+        with torch.inference_mode():
             logits = self.model(**inputs).logits
             probs = torch.softmax(logits, dim=-1)
             # Label 0: Real, Label 1: Fake based on Gustking's fine-tuning
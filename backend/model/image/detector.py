@@ -1,3 +1,4 @@
+import pickle
 import torch
 import torch.nn as nn
 import timm
@@ -8,16 +9,23 @@ from torchvision import transforms
 
 class ImageDeepfakeDetector:
     def __init__(self, variant="vae"):
+        self.model_name = f"genconvit_{variant}"
         self.device = torch.device("cpu")
         try:
             self.model = timm.create_model('convnext_tiny', pretrained=False, num_classes=2)
             weights_path = f"model/image/weights/genconvit_{variant}_inference.pth"
-            state_dict = torch.load(weights_path, map_location=self.device)
+            try:
+                state_dict = torch.load(weights_path, map_location=self.device, mmap=True, weights_only=True)
+            except pickle.UnpicklingError:
+                # Bundled checkpoint that also pickles non-tensor objects
+                state_dict = torch.load(weights_path, map_location=self.device, mmap=True, weights_only=False)
             
             # Filter mismatched layers
             filtered_dict = {k: v for k, v in state_dict.items() if 'fc' not in k}
-            self.model.load_state_dict(filtered_dict, strict=False)
+            self.model.load_state_dict(filtered_dict, strict=False, assign=True)
             self.model.to(self.device).eval()
+            # NHWC matches ConvNeXt's depthwise convs (oneDNN / cuDNN)
+            self.model = self.model.to(memory_format=torch.channels_last)
             
             # Standard normalization
             self.transform = transforms.Compose([
@@ -28,9 +36,8 @@ class ImageDeepfakeDetector:
         except Exception as e:
             raise RuntimeError(f"Sync Error: {str(e)}")
 
-    def _apply_forensic_filters(self, image_path):
-        """Standard OpenCV pipeline without face extraction."""
-        img = cv2.imread(image_path)
+    def _apply_forensic_filters(self, img):
+        """Standard OpenCV pipeline without face extraction (expects BGR)."""
         if img is None: return None
         
         # 1. Denoise
@@ -47,30 +54,52 @@ class ImageDeepfakeDetector:
         return Image.fromarray(cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
 
     def predict(self, image_path: str):
-        try:
-            processed_img = self._apply_forensic_filters(image_path)
-            if processed_img is None:
-                return {"error": "Could not process image."}
-            
-            img_tensor = self.transform(processed_img).unsqueeze(0).to(self.device)
-            
-            with torch.no_grad():
-                logits = self.model(img_tensor)
-                probs = torch.softmax(logits, dim=-1)
-                conf, pred = torch.max(probs, dim=-1)
+        return self._predict_bgr(cv2.imread(image_path))
+
+    def predict_bytes(self, image_bytes: bytes):
+        """Same as predict(), but decodes an in-memory upload (no temp file)."""
+        return self._predict_bgr(self._decode(image_bytes))
+
+    def preprocess_bytes(self, image_bytes: bytes):
+        """Decode + filter an upload into a (1, 3, 224, 224) tensor, or None."""
+        processed_img = self._apply_forensic_filters(self._decode(image_bytes))
+        if processed_img is None:
+            return None
+        return self.transform(processed_img).unsqueeze(0)
+
+    def predict_batch(self, batch: torch.Tensor):
+        """Run one forward pass over stacked tensors; one result dict per row."""
+        with torch.inference_mode():
+            logits = self.model(batch.to(self.device, memory_format=torch.channels_last))
+            probs = torch.softmax(logits, dim=-1)
+            conf, pred = torch.max(probs, dim=-1)
 
-            confidence = float(conf.item())
-            verdict = "Fake" if pred.item() == 1 else "Real"
+        results = []
+        for confidence, label, (real, fake) in zip(conf.tolist(), pred.tolist(), probs.tolist()):
+            verdict = "Fake" if label == 1 else "Real"
             
             # Thresholding for reliability
             if confidence < 0.75:
                 verdict = f"SUSPECTED ({verdict})"
 
-            return {
+            results.append({
                 "verdict": verdict,
                 "confidence": round(confidence, 4),
-                "probabilities": {"real": float(probs[0][0]), "fake": float(probs[0][1])}
-            }
+                "probabilities": {"real": real, "fake": fake}
+            })
+        return results
+
+    @staticmethod
+    def _decode(image_bytes: bytes):
+        return cv2.imdecode(np.frombuffer(image_bytes, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+    def _predict_bgr(self, img):
+        try:
+            processed_img = self._apply_forensic_filters(img)
+            if processed_img is None:
+                return {"error": "Could not process image."}
+            
+            img_tensor = self.transform(processed_img).unsqueeze(0)
+            return self.predict_batch(img_tensor)[0]
         except Exception as e:
             return {"error": str(e)}
-
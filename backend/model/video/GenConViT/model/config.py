@@ -4,7 +4,7 @@ import os
 #read yaml file
 
 def load_config():
-  with open(os.path.join('model','config.yaml')) as file:
+  with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config.yaml')) as file:
     config= yaml.safe_load(file)
 
   return config
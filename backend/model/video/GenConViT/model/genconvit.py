@@ -1,9 +1,13 @@
+import os
 import torch
 import torch.nn as nn
 from .genconvit_ed import GenConViTED
 from .genconvit_vae import GenConViTVAE
 from torchvision import transforms
 
+# Resolved from this file so loading doesn't depend on the working directory
+WEIGHT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'weight')
+
 class GenConViT(nn.Module):
 
     def __init__(self, config, ed, vae, net, fp16):
@@ -13,7 +17,7 @@ class GenConViT(nn.Module):
         if self.net=='ed':
             try:
                 self.model_ed = GenConViTED(config)
-                self.checkpoint_ed = torch.load(f'weight/{ed}.pth', map_location=torch.device('cpu'))
+                self.checkpoint_ed = torch.load(os.path.join(WEIGHT_DIR, f'{ed}.pth'), map_location=torch.device('cpu'))
 
                 if 'state_dict' in self.checkpoint_ed:
                     self.model_ed.load_state_dict(self.checkpoint_ed['state_dict'])
@@ -28,7 +32,7 @@ class GenConViT(nn.Module):
         elif self.net=='vae':
             try:
                 self.model_vae = GenConViTVAE(config)
-                self.checkpoint_vae = torch.load(f'weight/{vae}.pth', map_location=torch.device('cpu'))
+                self.checkpoint_vae = torch.load(os.path.join(WEIGHT_DIR, f'{vae}.pth'), map_location=torch.device('cpu'))
 
                 if 'state_dict' in self.checkpoint_vae:
                     self.model_vae.load_state_dict(self.checkpoint_vae['state_dict'])
@@ -44,8 +48,8 @@ class GenConViT(nn.Module):
             try:
                 self.model_ed = GenConViTED(config)
                 self.model_vae = GenConViTVAE(config)
-                self.checkpoint_ed = torch.load(f'weight/{ed}.pth', map_location=torch.device('cpu'))
-                self.checkpoint_vae = torch.load(f'weight/{vae}.pth', map_location=torch.device('cpu'))
+                self.checkpoint_ed = torch.load(os.path.join(WEIGHT_DIR, f'{ed}.pth'), map_location=torch.device('cpu'))
+                self.checkpoint_vae = torch.load(os.path.join(WEIGHT_DIR, f'{vae}.pth'), map_location=torch.device('cpu'))
                 if 'state_dict' in self.checkpoint_ed:
                     self.model_ed.load_state_dict(self.checkpoint_ed['state_dict'])
                 else:
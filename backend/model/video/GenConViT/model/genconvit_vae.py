@@ -2,7 +2,7 @@ import torch
 import torch.nn as nn
 from torchvision import transforms
 from timm import create_model
-from model.config import load_config
+from .config import load_config
 from .model_embedder import HybridEmbed
 
 config = load_config()
@@ -73,7 +73,7 @@ def preprocess_frame(frame):
 
 
 def pred_vid(df, model):
-    with torch.no_grad():
+    with torch.inference_mode():
         return max_prediction_value(torch.sigmoid(model(df).squeeze()))
 
 
@@ -604,7 +604,7 @@ export default function Detector({ type, title }: DetectorProps) {
 
         case 'image':
           // Use ensemble endpoint which returns heatmaps
-          endpoint = `${API_BASE_URL}/api/v1/detect/image`;
+          endpoint = `${API_BASE_URL}/api/v1/detect/image?include_heatmap=true`;
           requestBody = new FormData();
           requestBody.append('file', file!);
           break;